@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Symbol, Candle, PositionManager
+from .models import Symbol, Candle, PositionManager, CandleSyncState, Fill, FillDailySummary, \
+    CandleSchedule, State, BackfillJob, TradeTrace, \
+    PaperVariant, PaperPosition
 
 
 @admin.register(Symbol)
@@ -43,10 +45,41 @@ class CandleAdmin(admin.ModelAdmin):
     formatted_open_time.admin_order_field = 'open_time'
 
 
+@admin.register(CandleSyncState)
+class CandleSyncStateAdmin(admin.ModelAdmin):
+    list_display = ('symbol', 'interval', 'oldest_open_time', 'newest_open_time', 'last_closed_open_time',
+                    'backfill_status', 'updated')
+    list_filter = ('interval', 'backfill_status')
+    search_fields = ('symbol__symbol',)
+    ordering = ('symbol', 'interval')
+
+
+@admin.register(BackfillJob)
+class BackfillJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'symbol', 'interval', 'start_time', 'end_time', 'status', 'progress', 'created', 'finished')
+    list_filter = ('status', 'interval')
+    search_fields = ('symbol__symbol',)
+    ordering = ('-created',)
+
+    def progress(self, obj):
+        from .backfill import progress
+        return f"{progress(obj)['percent']:.1f}%"
+
+    progress.short_description = 'Progress'
+
+
+@admin.register(CandleSchedule)
+class CandleScheduleAdmin(admin.ModelAdmin):
+    list_display = ('symbol', 'interval', 'offset_seconds', 'evaluate_strategy', 'enabled', 'next_fire_time')
+    list_filter = ('interval', 'evaluate_strategy', 'enabled')
+    search_fields = ('symbol__symbol',)
+    ordering = ('symbol', 'interval')
+
+
 @admin.register(PositionManager)
 class PositionManagerAdmin(admin.ModelAdmin):
-    list_display = ('id', 'is_position_active', 'timestamp_cursor', 'sl_order_price', 'created', 'updated')
-    list_filter = ('is_position_active',)
+    list_display = ('id', 'state', 'is_position_active', 'timestamp_cursor', 'sl_order_price', 'created', 'updated')
+    list_filter = ('state', 'is_position_active')
     search_fields = ('remote_id',)
     ordering = ('-updated',)
     list_per_page = 50
@@ -57,7 +90,7 @@ class PositionManagerAdmin(admin.ModelAdmin):
             'classes': ('collapse',),  # Collapsible to reduce visibility of sensitive data
         }),
         ('Position Details', {
-            'fields': ('is_position_active', 'timestamp_cursor', 'remote_id'),
+            'fields': ('state', 'is_position_active', 'timestamp_cursor', 'remote_id', 'order_sequence'),
         }),
         ('Metadata', {
             'fields': ('created', 'updated', 'trace'),
@@ -112,7 +145,48 @@ class PositionManagerAdmin(admin.ModelAdmin):
     def toggle_position_active(self, request, queryset):
         for position in queryset:
             position.is_position_active = not position.is_position_active
+            position.state = State.Active.value if position.is_position_active else State.Inactive.value
             position.save()
         self.message_user(request, f"Updated position active status for {queryset.count()} position(s).")
 
     toggle_position_active.short_description = "Toggle position active status"
+
+
+@admin.register(Fill)
+class FillAdmin(admin.ModelAdmin):
+    list_display = ('trade_id', 'symbol', 'side', 'price', 'size', 'fee', 'profit', 'day')
+    list_filter = ('symbol', 'side', 'day')
+    search_fields = ('trade_id', 'order_id')
+    ordering = ('-fill_time',)
+    list_per_page = 100
+
+
+@admin.register(FillDailySummary)
+class FillDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ('position_manager', 'symbol', 'day', 'fill_count', 'volume', 'fees', 'profit', 'wins', 'losses')
+    list_filter = ('symbol', 'position_manager')
+    ordering = ('-day', 'symbol')
+    list_per_page = 100
+
+
+@admin.register(TradeTrace)
+class TradeTraceAdmin(admin.ModelAdmin):
+    list_display = ('position_manager', 'order_sequence', 'candle_close', 'started', 'duration_us')
+    list_filter = ('position_manager',)
+    ordering = ('-started',)
+    list_per_page = 100
+
+
+@admin.register(PaperVariant)
+class PaperVariantAdmin(admin.ModelAdmin):
+    list_display = ('name', 'symbol', 'interval', 'streak_length', 'tp_percentage', 'sl_percentage', 'enabled')
+    list_filter = ('enabled', 'symbol', 'interval')
+    search_fields = ('name',)
+
+
+@admin.register(PaperPosition)
+class PaperPositionAdmin(admin.ModelAdmin):
+    list_display = ('variant', 'direction', 'entry_time', 'entry_price', 'exit_time', 'outcome', 'pnl_percentage')
+    list_filter = ('variant', 'outcome', 'direction')
+    ordering = ('-entry_time',)
+    list_per_page = 100
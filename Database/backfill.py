@@ -0,0 +1,50 @@
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import BackfillJob, BackfillChunk, BackfillStatus, Symbol
+
+
+@transaction.atomic
+def plan_job(symbol, interval, start_time, end_time, chunk_ms):
+    """Create the job and its chunks once; calling again with the same range returns the existing job."""
+    Symbol.objects.get_or_create(symbol=symbol)
+    job, created = BackfillJob.objects.get_or_create(
+        symbol_id=symbol,
+        interval=interval,
+        start_time=start_time,
+        end_time=end_time,
+        defaults={'chunk_ms': chunk_ms}
+    )
+    if created:
+        BackfillChunk.objects.bulk_create([
+            BackfillChunk(job=job, start_time=chunk_start, end_time=min(chunk_start + job.chunk_ms, end_time))
+            for chunk_start in range(start_time, end_time, job.chunk_ms)
+        ], ignore_conflicts=True)
+    return job
+
+
+def pending_chunks(job):
+    # Running chunks are included: a chunk left Running by a dead worker is redone, which is safe
+    # because candle saves are upserts.
+    return job.chunks.exclude(status=BackfillStatus.Complete.value).order_by('-start_time')
+
+
+def progress(job):
+    totals = job.chunks.aggregate(
+        total=Count('id'),
+        complete=Count('id', filter=Q(status=BackfillStatus.Complete.value)),
+        rows=Sum('rows'),
+        busy_ms=Sum('duration_ms')
+    )
+    elapsed = ((job.finished or timezone.now()) - job.created).total_seconds()
+    rows = totals['rows'] or 0
+    return {
+        'job': job.pk,
+        'chunks': totals['total'],
+        'complete': totals['complete'],
+        'percent': 100 * totals['complete'] / totals['total'] if totals['total'] else 100.0,
+        'rows': rows,
+        'rows_per_second': rows / elapsed if elapsed > 0 else 0.0,
+        'worker_seconds': (totals['busy_ms'] or 0) / 1000,
+    }
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import logging
+import pickle
+import time
+import uuid
+
+import redis
+from django.conf import settings
+from django.db import transaction
+
+from .models import Candle, CANDLE_FIELDS
+from .utils import get_redis
+
+LRU_KEY = "cache:lru"
+SIZES_KEY = "cache:sizes"
+BYTES_KEY = "cache:bytes"
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _version_key(symbol, interval):
+    return f"candle-version:{symbol}:{interval}"
+
+
+def bump_version(symbol, interval):
+    """Invalidate every cached result of a series once the current transaction commits."""
+    def bump():
+        try:
+            get_redis().incr(_version_key(symbol, interval))
+        except redis.RedisError as e:
+            logger.error("Cache version bump failed", extra={"symbol": symbol, "interval": interval, "error": str(e)})
+    transaction.on_commit(bump)
+
+
+def series_version(symbol, interval):
+    return int(get_redis().get(_version_key(symbol, interval)) or 0)
+
+
+def cache_key(name, symbol, interval, params):
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"cache:{name}:{symbol}:{interval}:{series_version(symbol, interval)}:{digest}"
+
+
+def _store(client, key, payload):
+    # Overwriting an entry replaces its bytes in the total rather than adding to them.
+    previous = int(client.hget(SIZES_KEY, key) or 0)
+    pipeline = client.pipeline()
+    pipeline.set(key, payload)
+    pipeline.zadd(LRU_KEY, {key: time.time()})
+    pipeline.hset(SIZES_KEY, key, len(payload))
+    pipeline.incrby(BYTES_KEY, len(payload) - previous)
+    total = pipeline.execute()[-1]
+    while total > settings.CACHE_MAX_BYTES:
+        evicted = client.zpopmin(LRU_KEY, 16)
+        if not evicted:
+            break
+        keys = [member for member, _ in evicted]
+        sizes = client.hmget(SIZES_KEY, keys)
+        pipeline = client.pipeline()
+        pipeline.delete(*keys)
+        pipeline.hdel(SIZES_KEY, *keys)
+        pipeline.decrby(BYTES_KEY, sum(int(size or 0) for size in sizes))
+        total = pipeline.execute()[-1]
+
+
+def cached(name, symbol, interval, params, compute):
+    """Return compute() for this series and params, served from Redis while the series version is unchanged.
+
+    Entries live until evicted by size (least recently used first). On a miss only one caller computes,
+    the others wait for its result; if Redis is unavailable the value is simply computed.
+    """
+    value = _MISSING
+    try:
+        client = get_redis()
+        key = cache_key(name, symbol, interval, params)
+        payload = client.get(key)
+        if payload is None:
+            token = uuid.uuid4().hex
+            lock = f"lock:{key}"
+            if client.set(lock, token, nx=True, px=settings.CACHE_LOCK_MS):
+                try:
+                    value = compute()
+                    _store(client, key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+                finally:
+                    if client.get(lock) == token.encode():
+                        client.delete(lock)
+                return value
+            deadline = time.monotonic() + settings.CACHE_LOCK_MS / 1000
+            while payload is None and client.exists(lock) and time.monotonic() < deadline:
+                time.sleep(0.02)
+                payload = client.get(key)
+            if payload is None:
+                return compute()
+        value = pickle.loads(payload)
+        client.zadd(LRU_KEY, {key: time.time()})
+        return value
+    except redis.RedisError as e:
+        logger.warning("Cache unavailable", extra={"cache": name, "error": str(e)})
+        # A value already computed or read is still good; only the bookkeeping around it failed.
+        return compute() if value is _MISSING else value
+
+
+def load_arrays(symbol, interval, start_time=None, end_time=None, fields=CANDLE_FIELDS, limit=None):
+    """Cached Candle.objects.load_arrays for repeated range reads."""
+    return cached("candles", symbol, interval,
+                  {"start": start_time, "end": end_time, "fields": list(fields), "limit": limit},
+                  lambda: Candle.objects.load_arrays(symbol, interval, start_time, end_time, fields, limit=limit))
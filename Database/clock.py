@@ -0,0 +1,13 @@
+import time
+from datetime import datetime
+
+
+class SystemClock:
+    def now_ms(self):
+        return int(datetime.now().timestamp() * 1000)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+system_clock = SystemClock()
@@ -0,0 +1,102 @@
+import logging
+import os
+import socket
+import time
+
+import redis
+from django.conf import settings
+
+from .utils import get_redis
+
+EVENT_FIELDS = {'t': 'open_time', 'o': 'open', 'h': 'high', 'l': 'low', 'c': 'close', 'v': 'base_volume',
+                'q': 'usdt_volume'}
+
+logger = logging.getLogger(__name__)
+
+
+def stream_key(symbol, interval):
+    return f"candles:{symbol}:{interval}"
+
+
+def publish_closed_candles(symbol, interval, candles):
+    """XADD one compact event per newly closed candle (Bitget-style rows) to the series' stream.
+
+    Publishing is best effort: ingestion never fails because Redis is unavailable.
+    """
+    if not candles or not settings.CANDLE_EVENTS_ENABLED:
+        return 0
+    key = stream_key(symbol, interval)
+    try:
+        pipeline = get_redis().pipeline(transaction=False)
+        for candle in sorted(candles, key=lambda row: int(row[0])):
+            pipeline.xadd(key, dict(zip(EVENT_FIELDS, (str(value) for value in candle[:7]))),
+                          maxlen=settings.CANDLE_EVENT_MAXLEN, approximate=True)
+        pipeline.execute()
+    except redis.RedisError as e:
+        logger.warning("Publishing candle events failed",
+                       extra={"stream": key, "events": len(candles), "error": str(e)})
+        return 0
+    return len(candles)
+
+
+def _decode(stream, message_id, fields):
+    _, symbol, interval = stream.decode().split(":")
+    event = {'id': message_id.decode(), 'stream': stream.decode(), 'symbol': symbol, 'interval': int(interval)}
+    for short, name in EVENT_FIELDS.items():
+        value = fields[short.encode()].decode()
+        event[name] = int(value) if name == 'open_time' else float(value)
+    return event
+
+
+class CandleSubscriber:
+    """Reads candle events of some series as one consumer of a consumer group.
+
+    Every group sees every event once; consumers in the same group share the work. Events that a crashed
+    consumer read but never acknowledged are claimed again after `claim_idle_ms`.
+    """
+
+    def __init__(self, group, series, consumer=None, claim_idle_ms=60000):
+        self.group = group
+        self.streams = [stream_key(symbol, interval) for symbol, interval in series]
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.claim_idle_ms = claim_idle_ms
+        self.redis = get_redis()
+        for stream in self.streams:
+            try:
+                self.redis.xgroup_create(stream, group, id="$", mkstream=True)
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    def claim_stale(self):
+        events = []
+        for stream in self.streams:
+            _, messages, *_ = self.redis.xautoclaim(stream, self.group, self.consumer, self.claim_idle_ms)
+            events.extend(_decode(stream.encode(), message_id, fields) for message_id, fields in messages if fields)
+        return events
+
+    def read(self, block_ms=5000, count=100):
+        response = self.redis.xreadgroup(self.group, self.consumer, {stream: ">" for stream in self.streams},
+                                         count=count, block=block_ms)
+        return [_decode(stream, message_id, fields)
+                for stream, messages in response or [] for message_id, fields in messages]
+
+    def ack(self, event):
+        self.redis.xack(event['stream'], self.group, event['id'])
+
+    def listen(self, handler, block_ms=5000):
+        """Call `handler(event)` for every event and acknowledge it once the handler returns.
+
+        Stale events are claimed on start and again every `claim_idle_ms`, so work left by a consumer that dies
+        later is still picked up.
+        """
+        next_claim = 0
+        while True:
+            if time.monotonic() >= next_claim:
+                events = self.claim_stale()
+                next_claim = time.monotonic() + self.claim_idle_ms / 1000
+            else:
+                events = self.read(min(block_ms, max(1, int((next_claim - time.monotonic()) * 1000))))
+            for event in events:
+                handler(event)
+                self.ack(event)
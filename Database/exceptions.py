@@ -26,3 +26,21 @@ class WrongActionBasedOnState(Exception):
     def __init__(self):
         self.code = -103
         self.message = 'Wrong action!'
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self):
+        self.code = -104
+        self.message = 'Deadline exceeded!'
+
+
+class CircuitOpen(Exception):
+    def __init__(self, message):
+        self.code = -105
+        self.message = message
+
+
+class ExchangeRejected(Exception):
+    def __init__(self, message):
+        self.code = -106
+        self.message = message
@@ -0,0 +1,156 @@
+import io
+import multiprocessing
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+from django.db.models import Max, Min, Q
+
+from . import cache
+from .models import Candle, CandleSyncState, CANDLE_FIELDS, Symbol
+
+# Column order of the Binance kline dumps; columns that are not candle fields (close_time) and extra trailing
+# columns (trade count, taker volumes) are ignored.
+DEFAULT_COLUMNS = ('open_time', 'open', 'high', 'low', 'close', 'base_volume', 'close_time', 'usdt_volume')
+COPY_BATCH_ROWS = 1_000_000
+RECORD_DTYPE = np.dtype([(field, np.int64 if field == 'open_time' else np.float64) for field in CANDLE_FIELDS])
+
+
+def find_files(paths):
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() in (".csv", ".zip")))
+        else:
+            files.append(path)
+    return files
+
+
+def _read_csv(stream, columns):
+    try:
+        frame = pd.read_csv(stream, header=None, usecols=range(len(columns)), names=list(columns),
+                            dtype=str, engine='c')
+    except pd.errors.EmptyDataError:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    # Dumps may or may not carry a header row; anything non-numeric in open_time is dropped.
+    times = pd.to_numeric(frame['open_time'], errors='coerce')
+    frame = frame[times.notna()]
+    records = np.zeros(len(frame), dtype=RECORD_DTYPE)
+    open_times = times[times.notna()].to_numpy(dtype=np.float64)
+    # Normalize second and microsecond timestamps to milliseconds.
+    open_times = np.where(open_times < 1e11, open_times * 1000,
+                          np.where(open_times > 1e14, open_times // 1000, open_times))
+    records['open_time'] = open_times.astype(np.int64)
+    for field in CANDLE_FIELDS[1:]:
+        # USDT-margined dumps carry a single quote volume column, used for both USDT and quote volume.
+        source = field if field in frame else 'usdt_volume' if field == 'quote_volume' else None
+        if source in frame:
+            records[field] = frame[source].to_numpy(dtype=np.float64)
+    return records
+
+
+def parse_file(path, columns=DEFAULT_COLUMNS):
+    """Parse one CSV, or every CSV inside one ZIP, into a structured array of CANDLE_FIELDS."""
+    path = Path(path)
+    if path.suffix.lower() != ".zip":
+        return _read_csv(path, columns)
+    with zipfile.ZipFile(path) as archive:
+        parts = [_read_csv(archive.open(name), columns) for name in archive.namelist() if name.lower().endswith(".csv")]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=RECORD_DTYPE)
+
+
+def parse_files(files, columns=DEFAULT_COLUMNS, workers=None):
+    """Yield parsed arrays as worker processes finish them, in file order."""
+    if workers == 1:
+        for path in files:
+            yield parse_file(path, columns)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as executor:
+        yield from executor.map(parse_file, files, [columns] * len(files))
+
+
+def _copy_insert(symbol, interval, records):
+    """COPY into a temporary table, then insert what is not stored yet. Returns the inserted row count."""
+    columns = ", ".join(f'"{field}"' for field in CANDLE_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS candles_load ("open_time" bigint, '
+            + ", ".join(f'"{field}" double precision' for field in CANDLE_FIELDS[1:])
+            + ") ON COMMIT DELETE ROWS"
+        )
+        for start in range(0, len(records), COPY_BATCH_ROWS):
+            buffer = io.StringIO()
+            pd.DataFrame(records[start:start + COPY_BATCH_ROWS]).to_csv(buffer, header=False, index=False)
+            buffer.seek(0)
+            cursor.cursor.copy_expert(f"COPY candles_load ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(
+            f'INSERT INTO candles ("symbol_id", "interval", {columns}) '
+            f"SELECT %s, %s, {columns} FROM candles_load "
+            'ON CONFLICT ("open_time", "symbol_id", "interval") DO NOTHING',
+            [symbol, interval]
+        )
+        return cursor.rowcount
+
+
+def _executemany_insert(symbol, interval, records, batch_size=50000):
+    """Fallback for databases without COPY; needs ON CONFLICT support (SQLite 3.24+)."""
+    columns = ", ".join(f'"{field}"' for field in CANDLE_FIELDS)
+    sql = (f'INSERT INTO candles ("symbol_id", "interval", {columns}) '
+           f"VALUES ({', '.join(['%s'] * (len(CANDLE_FIELDS) + 2))}) "
+           'ON CONFLICT ("open_time", "symbol_id", "interval") DO NOTHING')
+    inserted = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(records), batch_size):
+            cursor.executemany(sql, [(symbol, interval, *row) for row in records[start:start + batch_size].tolist()])
+            inserted += cursor.rowcount
+    return inserted
+
+
+def insert(symbol, interval, records):
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            return _copy_insert(symbol, interval, records)
+        return _executemany_insert(symbol, interval, records)
+
+
+def refresh_sync_state(symbol, interval, now_ms):
+    bounds = Candle.unordered_objects.filter(symbol_id=symbol, interval=interval).aggregate(
+        oldest=Min('open_time'),
+        newest=Max('open_time'),
+        last_closed=Max('open_time', filter=Q(open_time__lte=now_ms - interval)),
+    )
+    CandleSyncState.objects.update_or_create(
+        symbol_id=symbol,
+        interval=interval,
+        defaults={
+            'oldest_open_time': bounds['oldest'],
+            'newest_open_time': bounds['newest'],
+            'last_closed_open_time': bounds['last_closed'],
+        },
+    )
+
+
+def load(symbol, interval, paths, columns=DEFAULT_COLUMNS, workers=None):
+    """Parse kline dumps in parallel and insert them file by file; existing candles are kept."""
+    Symbol.objects.get_or_create(symbol=symbol)
+    files = find_files(paths)
+    started = time.perf_counter()
+    rows = inserted = 0
+    for records in parse_files(files, columns, workers):
+        rows += len(records)
+        inserted += insert(symbol, interval, records)
+    refresh_sync_state(symbol, interval, int(time.time() * 1000))
+    cache.bump_version(symbol, interval)
+    seconds = time.perf_counter() - started
+    return {
+        "files": len(files),
+        "rows": rows,
+        "inserted": inserted,
+        "duplicates": rows - inserted,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0,
+    }
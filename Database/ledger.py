@@ -0,0 +1,112 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+
+from .models import Fill, FillDailySummary, PositionManager
+from .utils import get_param
+
+
+def sync_fills(position_manager, coin, start_time=None, end_time=None):
+    """Page through the fills endpoint from the newest stored fill onwards and record what is new."""
+    if start_time is None:
+        start_time = Fill.objects.filter(
+            position_manager=position_manager,
+            symbol=coin
+        ).aggregate(last=Max('fill_time'))['last'] or 0
+    if end_time is None:
+        end_time = int(datetime.now().timestamp() * 1000)
+
+    fills = []
+    last_end_id = None
+    while True:
+        page = position_manager.get_fills(coin=coin, start_time=start_time, end_time=end_time,
+                                          last_end_id=last_end_id)
+        if not page:
+            break
+        fills.extend(page)
+        last_end_id = get_param(page[-1], "tradeId")
+    return record_fills(position_manager, fills)
+
+
+@transaction.atomic
+def record_fills(position_manager, fills):
+    # Lock the account row so concurrent syncs cannot both count the same fill in the rollups.
+    PositionManager.objects.select_for_update().filter(pk=position_manager.pk).first()
+
+    by_trade_id = {get_param(fill, "tradeId"): fill for fill in fills}
+    existing = set(Fill.objects.filter(
+        position_manager=position_manager,
+        trade_id__in=list(by_trade_id)
+    ).values_list('trade_id', flat=True))
+
+    new_fills = []
+    for trade_id, fill in by_trade_id.items():
+        if trade_id in existing:
+            continue
+        fill_time = int(get_param(fill, "cTime"))
+        new_fills.append(Fill(
+            position_manager=position_manager,
+            trade_id=trade_id,
+            order_id=get_param(fill, "orderId"),
+            symbol=get_param(fill, "symbol"),
+            side=get_param(fill, "side"),
+            price=Decimal(get_param(fill, "price")),
+            size=Decimal(get_param(fill, "sizeQty")),
+            fee=Decimal(get_param(fill, "fee") or 0),
+            fill_amount=Decimal(get_param(fill, "fillAmount") or 0),
+            profit=Decimal(get_param(fill, "profit") or 0),
+            fill_time=fill_time,
+            day=datetime.fromtimestamp(fill_time / 1000, tz=timezone.utc).date(),
+        ))
+    Fill.objects.bulk_create(new_fills, batch_size=1000)
+    _roll_up(position_manager, new_fills)
+    return len(new_fills)
+
+
+def _roll_up(position_manager, fills):
+    totals = defaultdict(lambda: {"fill_count": 0, "volume": Decimal(0), "fees": Decimal(0),
+                                  "profit": Decimal(0), "wins": 0, "losses": 0})
+    for fill in fills:
+        total = totals[(fill.symbol, fill.day)]
+        total["fill_count"] += 1
+        total["volume"] += fill.fill_amount
+        total["fees"] += fill.fee
+        total["profit"] += fill.profit
+        total["wins"] += fill.profit > 0
+        total["losses"] += fill.profit < 0
+
+    for (symbol, day), total in totals.items():
+        FillDailySummary.objects.get_or_create(position_manager=position_manager, symbol=symbol, day=day)
+        FillDailySummary.objects.filter(
+            position_manager=position_manager,
+            symbol=symbol,
+            day=day
+        ).update(**{key: F(key) + value for key, value in total.items()})
+
+
+def pnl_summary(position_manager=None, symbol=None, start_day=None, end_day=None):
+    summaries = FillDailySummary.objects.all()
+    if position_manager is not None:
+        summaries = summaries.filter(position_manager=position_manager)
+    if symbol is not None:
+        summaries = summaries.filter(symbol=symbol)
+    if start_day is not None:
+        summaries = summaries.filter(day__gte=start_day)
+    if end_day is not None:
+        summaries = summaries.filter(day__lte=end_day)
+
+    totals = summaries.aggregate(
+        fills=Sum('fill_count'),
+        volume=Sum('volume'),
+        fees=Sum('fees'),
+        profit=Sum('profit'),
+        wins=Sum('wins'),
+        losses=Sum('losses')
+    )
+    closed = (totals['wins'] or 0) + (totals['losses'] or 0)
+    totals['win_rate'] = totals['wins'] / closed if closed else None
+    totals['net_profit'] = (totals['profit'] or 0) + (totals['fees'] or 0)
+    return totals
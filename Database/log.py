@@ -0,0 +1,85 @@
+import atexit
+import itertools
+import logging
+import queue
+import re
+import sys
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from pythonjsonlogger.json import JsonFormatter
+
+correlation_id = ContextVar("correlation_id", default=None)
+
+SECRET_KEYS = {"access-key", "access-sign", "access-passphrase", "api_key", "secret_key", "api_passphrase"}
+SECRET_PATTERN = re.compile(
+    r"""((?:ACCESS-(?:KEY|SIGN|PASSPHRASE)|api_key|secret_key|api_passphrase)["']?\s*[:=]\s*b?["']?)[^"',\s}]+""",
+    re.IGNORECASE)
+REDACTED = "***"
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {key: REDACTED if str(key).lower() in SECRET_KEYS else redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(item) for item in value)
+    if isinstance(value, str):
+        return SECRET_PATTERN.sub(rf"\1{REDACTED}", value)
+    return value
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamps the current task run's correlation ID; runs in the logging thread, before the record is queued."""
+
+    def filter(self, record):
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one in `every` DEBUG records whose `payload` extra is larger than `min_bytes`."""
+
+    def __init__(self, every=100, min_bytes=2048):
+        super().__init__()
+        self.every = every
+        self.min_bytes = min_bytes
+        self.counter = itertools.count()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        payload = getattr(record, "payload", None)
+        if payload is None or len(payload) < self.min_bytes:
+            return True
+        return next(self.counter) % self.every == 0
+
+
+class RedactionFilter(logging.Filter):
+    def filter(self, record):
+        record.msg = redact(record.getMessage())
+        record.args = None
+        for name, value in vars(record).items():
+            if name not in ("msg", "args") and isinstance(value, (dict, list, tuple, str)):
+                setattr(record, name, redact(value))
+        return True
+
+
+class BackgroundJSONHandler(QueueHandler):
+    """Queues records for a listener thread that redacts, formats them as JSON and writes them out.
+
+    The caller only pays for the filters attached to this handler and a queue put.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        target = logging.StreamHandler(stream or sys.stdout)
+        target.addFilter(RedactionFilter())
+        target.setFormatter(JsonFormatter("%(asctime)s %(levelname)s %(name)s %(message)s %(correlation_id)s",
+                                          rename_fields={"levelname": "level", "name": "logger"}))
+        self.listener = QueueListener(self.queue, target, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def prepare(self, record):
+        # The queue is in-process, so formatting (and traceback rendering) is left to the listener thread.
+        return record
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ExchangeAPI.TickStore import INST_TYPES, TickCapture
+
+
+class Command(BaseCommand):
+    help = "Record public trades and mark prices into the tick store until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("symbols", nargs="+")
+        parser.add_argument("--root", default=settings.TICK_STORE_DIR)
+        parser.add_argument("--market", choices=sorted(INST_TYPES), default=settings.TICK_CAPTURE_MARKET)
+
+    def handle(self, *args, **options):
+        capture = TickCapture(options["root"], options["symbols"], market=options["market"])
+        self.stdout.write(f"Capturing {', '.join(options['symbols'])} into {options['root']}")
+        try:
+            capture.run()
+        except KeyboardInterrupt:
+            self.stdout.write(f"Stopped after {capture.received} ticks")
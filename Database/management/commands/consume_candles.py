@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Database import tasks
+from Database.events import CandleSubscriber
+from Database.models import PaperVariant
+from ExchangeAPI.APICallManager import Interval
+
+
+def strategy_series():
+    return [(tasks.SYMBOL, tasks.INTERVAL.to_db_format())]
+
+
+def paper_series():
+    return list(PaperVariant.objects.filter(enabled=True).values_list('symbol_id', 'interval').distinct())
+
+
+# Consumer group -> (default series, what to run when one of them closes a candle).
+# The strategy group expects its series to be ingested by an ingestion-only CandleSchedule (or any other
+# save_to_db caller); the evaluation it triggers reads the stored candles and publishes nothing itself.
+HANDLERS = {
+    "strategy": (strategy_series, lambda event: tasks.evaluate_closed_candle.delay()),
+    "paper": (paper_series, lambda event: tasks.run_paper_trading.delay()),
+}
+
+
+class Command(BaseCommand):
+    help = "Consume closed-candle events from Redis streams and trigger the group's tasks, instead of polling."
+
+    def add_arguments(self, parser):
+        parser.add_argument("group", choices=sorted(HANDLERS))
+        parser.add_argument("--series", nargs="*", help="SYMBOL:INTERVAL pairs, e.g. DOGEUSDT:HOUR_1")
+        parser.add_argument("--consumer", help="Consumer name (default: host-pid)")
+
+    def handle(self, *args, **options):
+        default_series, handler = HANDLERS[options["group"]]
+        if options["series"]:
+            try:
+                series = [(symbol, Interval[interval].to_db_format())
+                          for symbol, interval in (pair.split(":") for pair in options["series"])]
+            except (KeyError, ValueError):
+                raise CommandError("Series must be SYMBOL:INTERVAL with an Interval name")
+        else:
+            series = default_series()
+        if not series:
+            raise CommandError("No series to subscribe to")
+
+        subscriber = CandleSubscriber(options["group"], series, consumer=options["consumer"])
+        self.stdout.write(f"{subscriber.consumer} consuming {', '.join(subscriber.streams)} as {options['group']}")
+
+        def dispatch(event):
+            self.stdout.write(f"{event['symbol']} {event['interval']} closed at {event['open_time']}")
+            handler(event)
+
+        try:
+            subscriber.listen(dispatch)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Database.klines import DEFAULT_COLUMNS, load
+from ExchangeAPI.APICallManager import Interval
+
+
+class Command(BaseCommand):
+    help = "Load historical kline CSV/ZIP dumps into the candles table, skipping candles already stored."
+
+    def add_arguments(self, parser):
+        parser.add_argument("symbol")
+        parser.add_argument("interval", choices=[interval.name for interval in Interval])
+        parser.add_argument("paths", nargs="+", help="Files or directories of .csv/.zip dumps")
+        parser.add_argument("--workers", type=int, help="Parser processes (default: one per core)")
+        parser.add_argument("--columns", default=",".join(DEFAULT_COLUMNS),
+                            help="Comma-separated column names of the dump, in order")
+
+    def handle(self, *args, **options):
+        columns = tuple(options["columns"].split(","))
+        missing = set(DEFAULT_COLUMNS[:5]) - set(columns)
+        if missing:
+            raise CommandError(f"Columns must include {', '.join(sorted(missing))}")
+        report = load(options["symbol"], Interval[options["interval"]].to_db_format(), options["paths"],
+                      columns=columns, workers=options["workers"])
+        self.stdout.write(
+            f"{report['files']} files, {report['rows']} rows, {report['inserted']} inserted, "
+            f"{report['duplicates']} duplicates in {report['seconds']:.1f}s "
+            f"({report['rows_per_second']:,.0f} rows/s)"
+        )
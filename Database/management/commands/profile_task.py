@@ -0,0 +1,122 @@
+import contextlib
+import io
+import random
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from Database import tasks
+from Database.models import Candle, PositionManager, PositionDirection, State
+from Database.profiling import format_stats, profile
+from ExchangeAPI.APICallManager import CandleAgent
+from ExchangeAPI.ExchangeSimulator import ExchangeSimulator
+from ExchangeAPI.MarketData import LocalVenueProvider, MarketDataRouter
+from Strategies import Backtest
+from Strategies.Replay import ReplayEngine, SimulatedClock
+
+TARGETS = ("check_candles_and_open", "check_position", "ingest", "backtest", "replay")
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Profile a task, ingestion or a backtest against stored candles and the local exchange simulator. "
+            "Every run starts from the same data and is rolled back afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("target", choices=TARGETS)
+        parser.add_argument("--profiler", choices=("cprofile", "sample"), default="cprofile")
+        parser.add_argument("--interval-ms", type=float, default=1.0, help="Sampling interval")
+        parser.add_argument("--output", help="Write the profile here: pstats for cprofile, folded stacks for sample")
+        parser.add_argument("--at", type=int, help="Simulated time (ms); defaults to just after the last stored candle")
+        parser.add_argument("--days", type=int, default=120, help="History used by backtest and replay")
+        parser.add_argument("--candles", type=int, default=100, help="Candles fetched by ingest")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--top", type=int, default=15)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        np.random.seed(options["seed"])
+        interval_ms = tasks.INTERVAL.to_db_format()
+        last = Candle.objects.filter(symbol_id=tasks.SYMBOL, interval=interval_ms).last()
+        if last is None:
+            raise CommandError(f"No {tasks.INTERVAL.name} candles stored for {tasks.SYMBOL}")
+        at = options["at"] or last.open_time + interval_ms + 2000
+
+        result = None
+        with ExchangeSimulator() as simulator, override_settings(COINCATCH_BASE_URL=simulator.base_url):
+            simulator.engine.set_mark_price(tasks.COIN, float(last.close))
+            try:
+                with transaction.atomic():
+                    run = self._prepare(options["target"], simulator, at, options)
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        result = profile(run, options["profiler"], options["interval_ms"] / 1000)
+                    raise Rollback
+            except Rollback:
+                pass
+        self._report(result, options)
+
+    def _prepare(self, target, simulator, at, options):
+        """Set up the state the target needs outside the profiled call and return the call itself."""
+        clock = SimulatedClock(at)
+        day_ms = 24 * 60 * 60 * 1000
+        router = MarketDataRouter([LocalVenueProvider(seed=options["seed"])])
+
+        if target in ("check_candles_and_open", "check_position"):
+            simulator.engine.add_account("profile", "profile", "profile")
+            position_manager = PositionManager.objects.create(api_key="profile", secret_key="profile",
+                                                              api_passphrase="profile", timestamp_cursor=0)
+            if target == "check_position":
+                with contextlib.redirect_stdout(io.StringIO()):
+                    quantity = Decimal(50) / position_manager.get_price(coin=tasks.COIN)
+                    position_manager.transition(State.Inactive, State.Pending, pending_since=clock.now_ms(),
+                                                open_attempt={"direction": PositionDirection.long.value,
+                                                              "quantity": str(quantity), "legs": {}})
+                    tasks._open_position(position_manager, clock)
+                return lambda: tasks.run_check_position(position_manager, clock)
+            agent = CandleAgent(symbol=tasks.SYMBOL, interval=tasks.INTERVAL, router=router)
+            return lambda: tasks.run_check_candles_and_open(position_manager, clock, agent)
+
+        if target == "ingest":
+            agent = CandleAgent(symbol=tasks.SYMBOL, interval=tasks.INTERVAL, router=router)
+            return lambda: agent.save_to_db(candles=agent.fetch_candles(at, options["candles"]))
+
+        start = at - options["days"] * day_ms
+        if target == "backtest":
+            return lambda: Backtest.summary(
+                Backtest.backtest(Backtest.load_candles(tasks.SYMBOL, tasks.INTERVAL.to_db_format(), start, at),
+                                  tasks.tp_percentage, tasks.sl_percentage, tasks.streak_length),
+                tasks.tp_percentage, tasks.sl_percentage)
+        return ReplayEngine(start, at).run
+
+    def _report(self, result, options):
+        top = options["top"]
+        self.stdout.write(f"{options['target']}: {result['seconds'] * 1000:.1f} ms, "
+                          f"peak traced memory {result['peak_memory'] / 1024:.1f} KiB")
+
+        if result["stats"] is not None:
+            self.stdout.write(format_stats(result["stats"], limit=top))
+            if options["output"]:
+                result["stats"].dump_stats(options["output"])
+        else:
+            for stack, count in result["sampler"].stacks.most_common(top):
+                self.stdout.write(f"{count:6d}  {stack.rsplit(';', 1)[-1]}")
+            if options["output"]:
+                with open(options["output"], "w") as stream:
+                    stream.write(result["sampler"].folded())
+        if options["output"]:
+            self.stdout.write(f"Profile written to {options['output']}")
+
+        self.stdout.write("\nTop allocation sites:")
+        for stat in result["memory"].statistics("lineno")[:top]:
+            self.stdout.write(f"  {stat.size / 1024:9.1f} KiB {stat.count:7d} blocks  {stat.traceback[0]}")
+
+        count, seconds = result["queries"].totals()
+        self.stdout.write(f"\nQueries: {count} in {seconds * 1000:.1f} ms")
+        for sql, count, seconds in result["queries"].top(top):
+            self.stdout.write(f"  {count:5d} x {seconds * 1000:8.2f} ms  {sql[:120]}")
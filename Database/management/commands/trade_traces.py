@@ -0,0 +1,32 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from Database.models import TradeTrace
+from Database.tracing import export_jsonl, latency_report
+
+
+class Command(BaseCommand):
+    help = "Print per-stage latency percentiles of recorded trade traces, or export them as JSON lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--position-manager", type=int)
+        parser.add_argument("--since", type=int, help="Only traces started at or after this time (ms)")
+        parser.add_argument("--export", help="Write traces to this file ('-' for stdout) instead of reporting")
+
+    def handle(self, *args, **options):
+        queryset = TradeTrace.objects.all()
+        if options["position_manager"] is not None:
+            queryset = queryset.filter(position_manager_id=options["position_manager"])
+        if options["since"] is not None:
+            queryset = queryset.filter(started__gte=options["since"])
+
+        if options["export"] == "-":
+            export_jsonl(queryset, sys.stdout)
+        elif options["export"]:
+            with open(options["export"], "w") as stream:
+                count = export_jsonl(queryset, stream)
+            self.stdout.write(f"Exported {count} traces to {options['export']}")
+        else:
+            self.stdout.write(json.dumps(latency_report(queryset), indent=2))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Database', '0005_positionmanager_sl_order_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandleSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.BigIntegerField()),
+                ('oldest_open_time', models.BigIntegerField(blank=True, null=True)),
+                ('newest_open_time', models.BigIntegerField(blank=True, null=True)),
+                ('last_closed_open_time', models.BigIntegerField(blank=True, null=True)),
+                ('backfill_status', models.IntegerField(choices=[(1, 'Pending'), (2, 'Running'), (3, 'Complete')], default=1)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('symbol', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Database.symbol')),
+            ],
+            options={
+                'db_table': 'candle_sync_states',
+                'unique_together': {('symbol', 'interval')},
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Database', '0006_candlesyncstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Fill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trade_id', models.CharField(max_length=100)),
+                ('order_id', models.CharField(max_length=100)),
+                ('symbol', models.CharField(max_length=50)),
+                ('side', models.CharField(max_length=30)),
+                ('price', models.DecimalField(decimal_places=10, max_digits=30)),
+                ('size', models.DecimalField(decimal_places=10, max_digits=30)),
+                ('fee', models.DecimalField(decimal_places=10, max_digits=30)),
+                ('fill_amount', models.DecimalField(decimal_places=10, max_digits=30)),
+                ('profit', models.DecimalField(decimal_places=10, max_digits=30)),
+                ('fill_time', models.BigIntegerField()),
+                ('day', models.DateField()),
+                ('position_manager', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fills', to='Database.positionmanager')),
+            ],
+            options={
+                'db_table': 'fills',
+                'indexes': [models.Index(fields=['position_manager', 'symbol', 'fill_time'], name='fills_positio_9cf9b1_idx'), models.Index(fields=['order_id'], name='fills_order_i_b54f74_idx')],
+                'unique_together': {('position_manager', 'trade_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='FillDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=50)),
+                ('day', models.DateField()),
+                ('fill_count', models.IntegerField(default=0)),
+                ('volume', models.DecimalField(decimal_places=10, default=0, max_digits=30)),
+                ('fees', models.DecimalField(decimal_places=10, default=0, max_digits=30)),
+                ('profit', models.DecimalField(decimal_places=10, default=0, max_digits=30)),
+                ('wins', models.IntegerField(default=0)),
+                ('losses', models.IntegerField(default=0)),
+                ('position_manager', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='Database.positionmanager')),
+            ],
+            options={
+                'db_table': 'fill_daily_summaries',
+                'indexes': [models.Index(fields=['day'], name='fill_daily__day_0bb325_idx'), models.Index(fields=['symbol', 'day'], name='fill_daily__symbol_349b7b_idx')],
+                'unique_together': {('position_manager', 'symbol', 'day')},
+            },
+        ),
+    ]
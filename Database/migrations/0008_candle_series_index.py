@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Database', '0007_fill_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='candle',
+            index=models.Index(fields=['symbol', 'interval', 'open_time'], name='candles_symbol__1441f2_idx'),
+        ),
+    ]
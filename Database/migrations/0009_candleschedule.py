@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Database', '0008_candle_series_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandleSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.BigIntegerField()),
+                ('offset_seconds', models.FloatField(default=2)),
+                ('evaluate_strategy', models.BooleanField(default=False)),
+                ('enabled', models.BooleanField(default=True)),
+                ('next_fire_time', models.BigIntegerField(blank=True, null=True)),
+                ('symbol', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Database.symbol')),
+            ],
+            options={
+                'db_table': 'candle_schedules',
+                'unique_together': {('symbol', 'interval')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:06
+
+from django.db import migrations, models
+
+
+def set_active_state(apps, schema_editor):
+    PositionManager = apps.get_model('Database', 'PositionManager')
+    PositionManager.objects.filter(is_position_active=True).update(state=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Database', '0009_candleschedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='positionmanager',
+            name='order_sequence',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='positionmanager',
+            name='state',
+            field=models.IntegerField(choices=[(1, 'Active'), (2, 'Inactive'), (3, 'Pending')], default=2),
+        ),
+        migrations.RunPython(set_active_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Database', '0010_positionmanager_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.BigIntegerField()),
+                ('start_time', models.BigIntegerField()),
+                ('end_time', models.BigIntegerField()),
+                ('chunk_ms', models.BigIntegerField()),
+                ('status', models.IntegerField(choices=[(1, 'Pending'), (2, 'Running'), (3, 'Complete')], default=1)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('symbol', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Database.symbol')),
+            ],
+            options={
+                'db_table': 'backfill_jobs',
+                'unique_together': {('symbol', 'interval', 'start_time', 'end_time')},
+            },
+        ),
+        migrations.CreateModel(
+            name='BackfillChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.BigIntegerField()),
+                ('end_time', models.BigIntegerField()),
+                ('status', models.IntegerField(choices=[(1, 'Pending'), (2, 'Running'), (3, 'Complete')], default=1)),
+                ('rows', models.IntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('duration_ms', models.IntegerField(blank=True, null=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='Database.backfilljob')),
+            ],
+            options={
+                'db_table': 'backfill_chunks',
+                'indexes': [models.Index(fields=['job', 'status'], name='backfill_ch_job_id_246538_idx')],
+                'unique_together': {('job', 'start_time')},
+            },
+        ),
+    ]
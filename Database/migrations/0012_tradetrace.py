@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Database', '0011_backfill_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeTrace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_sequence', models.IntegerField()),
+                ('candle_close', models.BigIntegerField(blank=True, null=True)),
+                ('started', models.BigIntegerField()),
+                ('duration_us', models.BigIntegerField()),
+                ('spans', models.JSONField(default=list)),
+                ('position_manager', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trade_traces', to='Database.positionmanager')),
+            ],
+            options={
+                'db_table': 'trade_traces',
+                'indexes': [models.Index(fields=['position_manager', 'started'], name='trade_trace_positio_1eea13_idx')],
+            },
+        ),
+    ]
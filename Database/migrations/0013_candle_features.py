@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:14
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.math
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Database', '0012_tradetrace'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candle',
+            name='bar_return',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('close'), '-', models.F('open')), '/', django.db.models.functions.comparison.NullIf('open', models.Value(0.0))), output_field=models.FloatField()),
+        ),
+        migrations.AddField(
+            model_name='candle',
+            name='body',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Abs(django.db.models.expressions.CombinedExpression(models.F('close'), '-', models.F('open'))), output_field=models.FloatField()),
+        ),
+        migrations.AddField(
+            model_name='candle',
+            name='direction',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(close__gte=models.F('open'), then=1), default=-1), output_field=models.SmallIntegerField()),
+        ),
+        migrations.AddField(
+            model_name='candle',
+            name='lower_wick',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Least('open', 'close'), '-', models.F('low')), output_field=models.FloatField()),
+        ),
+        migrations.AddField(
+            model_name='candle',
+            name='price_range',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('high'), '-', models.F('low')), output_field=models.FloatField()),
+        ),
+        migrations.AddField(
+            model_name='candle',
+            name='upper_wick',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('high'), '-', django.db.models.functions.comparison.Greatest('open', 'close')), output_field=models.FloatField()),
+        ),
+        migrations.AddIndex(
+            model_name='candle',
+            index=models.Index(condition=models.Q(('lower_wick__gte', django.db.models.expressions.CombinedExpression(models.Value(2), '*', models.F('body'))), ('price_range__gt', 0), ('upper_wick__lte', models.F('body'))), fields=['interval', 'open_time'], name='candles_hammer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candle',
+            index=models.Index(condition=models.Q(('lower_wick__lte', models.F('body')), ('price_range__gt', 0), ('upper_wick__gte', django.db.models.expressions.CombinedExpression(models.Value(2), '*', models.F('body')))), fields=['interval', 'open_time'], name='candles_shooting_star_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candle',
+            index=models.Index(condition=models.Q(('body__lte', django.db.models.expressions.CombinedExpression(models.Value(0.1), '*', models.F('price_range'))), ('price_range__gt', 0)), fields=['interval', 'open_time'], name='candles_doji_idx'),
+        ),
+    ]
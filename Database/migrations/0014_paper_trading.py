@@ -0,0 +1,55 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Database', '0013_candle_features'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaperVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('interval', models.BigIntegerField()),
+                ('streak_length', models.IntegerField(default=3)),
+                ('tp_percentage', models.FloatField(default=8)),
+                ('sl_percentage', models.FloatField(default=1)),
+                ('quantity_usdt', models.FloatField(default=50)),
+                ('enabled', models.BooleanField(default=True)),
+                ('timestamp_cursor', models.BigIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('symbol', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Database.symbol')),
+            ],
+            options={
+                'db_table': 'paper_variants',
+            },
+        ),
+        migrations.CreateModel(
+            name='PaperPosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('direction', models.CharField(max_length=10)),
+                ('signal_time', models.BigIntegerField()),
+                ('entry_time', models.BigIntegerField()),
+                ('entry_price', models.FloatField()),
+                ('quantity', models.FloatField()),
+                ('tp_price', models.FloatField()),
+                ('sl_price', models.FloatField()),
+                ('exit_time', models.BigIntegerField(blank=True, null=True)),
+                ('exit_price', models.FloatField(blank=True, null=True)),
+                ('outcome', models.CharField(blank=True, max_length=10, null=True)),
+                ('pnl_percentage', models.FloatField(blank=True, null=True)),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='positions', to='Database.papervariant')),
+            ],
+            options={
+                'db_table': 'paper_positions',
+                'indexes': [models.Index(fields=['variant', 'exit_time'], name='paper_posit_variant_dddb91_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Database', '0014_paper_trading'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UniverseRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('interval', models.BigIntegerField()),
+                ('rank', models.IntegerField(blank=True, null=True)),
+                ('score', models.FloatField(blank=True, null=True)),
+                ('volatility', models.FloatField(blank=True, null=True)),
+                ('usdt_volume', models.FloatField(blank=True, null=True)),
+                ('mean_correlation', models.FloatField(blank=True, null=True)),
+                ('coverage', models.FloatField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('symbol', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Database.symbol')),
+            ],
+            options={
+                'db_table': 'universe_rankings',
+                'indexes': [models.Index(fields=['interval', 'day', 'rank'], name='universe_ra_interva_31bd8b_idx')],
+                'unique_together': {('day', 'interval', 'symbol')},
+            },
+        ),
+    ]
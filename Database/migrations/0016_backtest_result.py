@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Database', '0015_universe_ranking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BacktestResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.BigIntegerField()),
+                ('start_time', models.BigIntegerField()),
+                ('end_time', models.BigIntegerField()),
+                ('code_version', models.CharField(max_length=64)),
+                ('params_hash', models.CharField(max_length=64)),
+                ('params', models.JSONField(default=dict)),
+                ('data_fingerprint', models.CharField(max_length=64)),
+                ('last_open_time', models.BigIntegerField(blank=True, null=True)),
+                ('candle_count', models.IntegerField(default=0)),
+                ('trades', models.BinaryField()),
+                ('summary', models.JSONField(default=dict)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('symbol', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Database.symbol')),
+            ],
+            options={
+                'db_table': 'backtest_results',
+                'unique_together': {('symbol', 'interval', 'start_time', 'code_version', 'params_hash')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Database', '0016_backtest_result'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='positionmanager',
+            name='open_attempt',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='positionmanager',
+            name='pending_since',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
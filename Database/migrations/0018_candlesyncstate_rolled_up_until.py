@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Database', '0017_positionmanager_open_attempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candlesyncstate',
+            name='rolled_up_until',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
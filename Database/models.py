@@ -1,14 +1,28 @@
-from django.db import models
+from django.conf import settings
+from django.db import connections, models, transaction
 from decimal import Decimal
 from enum import Enum
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Abs, Greatest, Least, NullIf
 import requests
+import threading
 import time
 import hmac
 import base64
+import logging
+
+import numpy as np
 
+from .exceptions import WrongActionBasedOnState, CircuitOpen
+from .resilience import get_breaker, request_timeout
+from .tracing import span
 from .utils import get_param, interpret_response
 
+_http = threading.local()
+ORDER_NOT_FOUND = "40768"
+logger = logging.getLogger(__name__)
+
 class Symbol(models.Model):
     symbol = models.CharField(max_length=50, primary_key=True)
 
@@ -18,10 +32,90 @@ class Symbol(models.Model):
     def __str__(self):
         return self.symbol
 
-class CandleManager(models.Manager):
+CANDLE_FIELDS = ('open_time', 'open', 'high', 'low', 'close', 'base_volume', 'usdt_volume', 'quote_volume')
+CANDLE_FEATURES = ('direction', 'body', 'upper_wick', 'lower_wick', 'price_range', 'bar_return')
+
+# Pattern screens; the partial indexes on Candle use the same conditions so the planner can match them.
+HAMMER = models.Q(price_range__gt=0, lower_wick__gte=2 * models.F('body'), upper_wick__lte=models.F('body'))
+SHOOTING_STAR = models.Q(price_range__gt=0, upper_wick__gte=2 * models.F('body'), lower_wick__lte=models.F('body'))
+DOJI = models.Q(price_range__gt=0, body__lte=0.1 * models.F('price_range'))
+
+
+class CandleQuerySet(models.QuerySet):
+    def green(self):
+        return self.filter(direction=1)
+
+    def red(self):
+        return self.filter(direction=-1)
+
+    def hammers(self):
+        return self.filter(HAMMER)
+
+    def shooting_stars(self):
+        return self.filter(SHOOTING_STAR)
+
+    def dojis(self):
+        return self.filter(DOJI)
+
+
+class CandleManager(models.Manager.from_queryset(CandleQuerySet)):
     def get_queryset(self):
         return super().get_queryset().order_by('open_time')
 
+    def series(self, symbols, interval, start_time=None, end_time=None):
+        queryset = self.get_queryset().filter(symbol_id__in=[getattr(symbol, 'pk', symbol) for symbol in symbols],
+                                              interval=interval)
+        if start_time is not None:
+            queryset = queryset.filter(open_time__gte=start_time)
+        if end_time is not None:
+            queryset = queryset.filter(open_time__lte=end_time)
+        return queryset
+
+    def to_array(self, queryset, fields=CANDLE_FIELDS, dtype=np.float64):
+        """Stream a queryset's columns from the DB cursor straight into a structured NumPy array."""
+        record_dtype = np.dtype([(field, self._field_dtype(field, dtype)) for field in fields])
+        sql, params = queryset.values_list(*fields).query.sql_with_params()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            return np.fromiter(cursor, dtype=record_dtype)
+
+    def _field_dtype(self, field, dtype):
+        if field == 'open_time':
+            return np.int64
+        if field == 'symbol_id':
+            return 'U50'
+        return dtype
+
+    def load_arrays(self, symbol, interval, start_time=None, end_time=None, fields=CANDLE_FIELDS,
+                    dtype=np.float64, limit=None):
+        queryset = self.series([symbol], interval, start_time, end_time)
+        if limit is not None:
+            queryset = queryset[:limit]
+        return self.to_array(queryset, fields, dtype)
+
+    def load_many(self, symbols, interval, start_time=None, end_time=None, fields=CANDLE_FIELDS, dtype=np.float64):
+        """Load several series with one query, returned as {symbol: structured array}."""
+        queryset = self.series(symbols, interval, start_time, end_time).order_by('symbol_id', 'open_time')
+        records = self.to_array(queryset, ('symbol_id',) + tuple(fields), dtype)
+        boundaries = np.flatnonzero(records['symbol_id'][1:] != records['symbol_id'][:-1]) + 1
+        return {str(chunk['symbol_id'][0]): chunk[list(fields)] for chunk in np.split(records, boundaries)
+                if len(chunk)}
+
+    def iter_arrays(self, symbol, interval, start_time=None, end_time=None, fields=CANDLE_FIELDS,
+                    dtype=np.float64, chunk_size=100000):
+        """Yield consecutive chunks of one series using keyset pagination on open_time."""
+        fields = tuple(fields) if 'open_time' in fields else ('open_time',) + tuple(fields)
+        cursor = start_time
+        while True:
+            queryset = self.series([symbol], interval, cursor, end_time)
+            chunk = self.to_array(queryset[:chunk_size], fields, dtype)
+            if len(chunk):
+                yield chunk
+            if len(chunk) < chunk_size:
+                return
+            cursor = int(chunk['open_time'][-1]) + 1
+
+
 class Candle(models.Model):
     open_time = models.BigIntegerField()
     symbol = models.ForeignKey(Symbol, on_delete=models.CASCADE)
@@ -34,14 +128,37 @@ class Candle(models.Model):
     usdt_volume = models.FloatField()
     quote_volume = models.FloatField()
 
+    # Computed by the database on write, so screens can filter on them without loading rows into Python.
+    direction = models.GeneratedField(
+        expression=models.Case(models.When(close__gte=models.F('open'), then=1), default=-1),
+        output_field=models.SmallIntegerField(),
+        db_persist=True,
+    )
+    body = models.GeneratedField(expression=Abs(models.F('close') - models.F('open')),
+                                 output_field=models.FloatField(), db_persist=True)
+    upper_wick = models.GeneratedField(expression=models.F('high') - Greatest('open', 'close'),
+                                       output_field=models.FloatField(), db_persist=True)
+    lower_wick = models.GeneratedField(expression=Least('open', 'close') - models.F('low'),
+                                       output_field=models.FloatField(), db_persist=True)
+    price_range = models.GeneratedField(expression=models.F('high') - models.F('low'),
+                                        output_field=models.FloatField(), db_persist=True)
+    bar_return = models.GeneratedField(expression=(models.F('close') - models.F('open')) / NullIf('open', Value(0.0)),
+                                       output_field=models.FloatField(), db_persist=True)
+
     objects = CandleManager()
 
-    unordered_objects = models.Manager()
+    unordered_objects = CandleQuerySet.as_manager()
 
     class Meta:
         db_table = 'candles'
         unique_together = (('open_time', 'symbol', 'interval'),)
         ordering = ['-open_time']
+        indexes = [
+            models.Index(fields=['symbol', 'interval', 'open_time']),
+            models.Index(fields=['interval', 'open_time'], condition=HAMMER, name='candles_hammer_idx'),
+            models.Index(fields=['interval', 'open_time'], condition=SHOOTING_STAR, name='candles_shooting_star_idx'),
+            models.Index(fields=['interval', 'open_time'], condition=DOJI, name='candles_doji_idx'),
+        ]
 
     def __str__(self):
         return f"{self.symbol} - {self.open_time}"
@@ -51,6 +168,93 @@ class Candle(models.Model):
         return self.open - self.close <= 0
 
 
+class BackfillStatus(Enum):
+    Pending = 1
+    Running = 2
+    Complete = 3
+
+    @classmethod
+    def choices(cls):
+        return [(key.value, key.name) for key in cls]
+
+
+class CandleSyncState(models.Model):
+    symbol = models.ForeignKey(Symbol, on_delete=models.CASCADE)
+    interval = models.BigIntegerField()
+    oldest_open_time = models.BigIntegerField(null=True, blank=True)
+    newest_open_time = models.BigIntegerField(null=True, blank=True)
+    last_closed_open_time = models.BigIntegerField(null=True, blank=True)
+    # Retention has rolled up (and purged) everything before this; only its incomplete buckets remain below it.
+    rolled_up_until = models.BigIntegerField(null=True, blank=True)
+    backfill_status = models.IntegerField(choices=BackfillStatus.choices(), default=BackfillStatus.Pending.value)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'candle_sync_states'
+        unique_together = (('symbol', 'interval'),)
+
+    def __str__(self):
+        return f"{self.symbol} - {self.interval}"
+
+
+class BackfillJob(models.Model):
+    symbol = models.ForeignKey(Symbol, on_delete=models.CASCADE)
+    interval = models.BigIntegerField()
+    start_time = models.BigIntegerField()
+    end_time = models.BigIntegerField()
+    chunk_ms = models.BigIntegerField()
+    status = models.IntegerField(choices=BackfillStatus.choices(), default=BackfillStatus.Pending.value)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'backfill_jobs'
+        unique_together = (('symbol', 'interval', 'start_time', 'end_time'),)
+
+    def __str__(self):
+        return f"{self.symbol} - {self.interval} [{self.start_time}, {self.end_time})"
+
+
+class BackfillChunk(models.Model):
+    job = models.ForeignKey(BackfillJob, on_delete=models.CASCADE, related_name='chunks')
+    start_time = models.BigIntegerField()
+    end_time = models.BigIntegerField()
+    status = models.IntegerField(choices=BackfillStatus.choices(), default=BackfillStatus.Pending.value)
+    rows = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    duration_ms = models.IntegerField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'backfill_chunks'
+        unique_together = (('job', 'start_time'),)
+        indexes = [
+            models.Index(fields=['job', 'status']),
+        ]
+
+
+class CandleSchedule(models.Model):
+    symbol = models.ForeignKey(Symbol, on_delete=models.CASCADE)
+    interval = models.BigIntegerField()
+    offset_seconds = models.FloatField(default=2)
+    evaluate_strategy = models.BooleanField(default=False)
+    enabled = models.BooleanField(default=True)
+    next_fire_time = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'candle_schedules'
+        unique_together = (('symbol', 'interval'),)
+
+    def __str__(self):
+        return f"{self.symbol} - {self.interval}"
+
+    def following_fire_time(self, now_ms):
+        """First `interval boundary + offset` strictly after now."""
+        offset_ms = int(self.offset_seconds * 1000)
+        fire_time = now_ms - now_ms % self.interval + offset_ms
+        return fire_time if fire_time > now_ms else fire_time + self.interval
+
+
 class Coin(Enum):
     type = str
     btc_spot = "BTCUSDT_SPBL"
@@ -103,7 +307,6 @@ class PlanType(Enum):
 
 
 class State(Enum):
-    type = int
     Active = 1
     Inactive = 2
     Pending = 3
@@ -130,6 +333,46 @@ class PositionManager(BaseModel):
     is_position_active = models.BooleanField(default=False)
     remote_id = models.CharField(max_length=2000, null=True, blank=True)
     sl_order_price = models.DecimalField(decimal_places=10, max_digits=20, null=True, blank=True)
+    state = models.IntegerField(choices=State.choices(), default=State.Inactive.value)
+    order_sequence = models.IntegerField(default=0)
+    pending_since = models.BigIntegerField(null=True, blank=True)
+    open_attempt = models.JSONField(null=True, blank=True)
+
+    def transition(self, from_state: State, to_state: State, **fields):
+        """Move to `to_state` under a row lock, or raise WrongActionBasedOnState if another worker moved first."""
+        with transaction.atomic():
+            locked = PositionManager.objects.select_for_update().get(pk=self.pk)
+            if locked.state != from_state.value:
+                raise WrongActionBasedOnState
+            if to_state == State.Pending:
+                fields["order_sequence"] = locked.order_sequence + 1
+            fields["state"] = to_state.value
+            fields["is_position_active"] = to_state != State.Inactive
+            for name, value in fields.items():
+                setattr(locked, name, value)
+                setattr(self, name, value)
+            locked.save(update_fields=list(fields) + ["updated"])
+
+    def client_oid(self, leg):
+        """Idempotency key of one order leg: retrying the same open attempt can never place it twice."""
+        return f"htbot-{self.pk}-{self.order_sequence}-{leg}"
+
+    def save_open_attempt(self):
+        """Persist the legs placed so far, so a resumed attempt never places one twice."""
+        PositionManager.objects.filter(pk=self.pk).update(open_attempt=self.open_attempt)
+
+    def record_trace(self, trace):
+        """Keep the spans of one open attempt: a TradeTrace row per trade, the latest one on `trace`."""
+        TradeTrace.objects.create(
+            position_manager=self,
+            order_sequence=self.order_sequence,
+            candle_close=trace.origin_ms,
+            started=trace.started_ms,
+            duration_us=trace.duration_us(),
+            spans=trace.to_dict()["spans"],
+        )
+        self.trace = trace.to_json()
+        PositionManager.objects.filter(pk=self.pk).update(trace=self.trace)
 
 
     def sign(self, message, secret_key):
@@ -166,22 +409,49 @@ class PositionManager(BaseModel):
         }
         return headers
 
+    def _send(self, method, request_path, body=None, query_string=None):
+        headers = self.create_header(method=method, request_path=request_path, body=body, query_string=query_string)
+        url = settings.COINCATCH_BASE_URL + request_path
+        if query_string is not None:
+            url += "?" + query_string
+        # One keep-alive session per worker thread instead of a new connection per call.
+        if not hasattr(_http, "session"):
+            _http.session = requests.Session()
+        logger.debug("Exchange request", extra={"method": method, "path": request_path, "query": query_string,
+                                                "headers": headers, "payload": body})
+        breaker = get_breaker(request_path)
+        breaker.allow()
+        try:
+            with span(f"{method} {request_path}"):
+                response = _http.session.request(method, url, data=body, headers=headers, timeout=request_timeout())
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # e.g. DeadlineExceeded before the request went out: says nothing about the endpoint.
+            breaker.release()
+            raise
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        logger.debug("Exchange response", extra={"method": method, "path": request_path,
+                                                 "status": response.status_code, "payload": response.text})
+        return response
+
 
-    def futures_trade(self, coin: Coin.type, quantity: Decimal, side: SideFutures.type):
+    def futures_trade(self, coin: Coin.type, quantity: Decimal, side: SideFutures.type, client_oid: str = None):
         method = "POST"
         request_path = "/api/mix/v1/order/placeOrder"
         body = (f'{{"side":"{side}",'
                 f'"symbol":"{coin}",'
                 f'"orderType":"market",'
                 f'"marginCoin":"USDT",'
+                + (f'"clientOid":"{client_oid}",' if client_oid else '') +
                 f'"size":"{quantity}"}}')
 
-        headers = self.create_header(method=method, request_path=request_path, body=body)
-        response = requests.post(url="https://api.coincatch.com/api/mix/v1/order/placeOrder",
-                                 data=body,
-                                 headers=headers)
+        response = self._send(method=method, request_path=request_path, body=body)
         remote_id = interpret_response(response.json(), "orderId")
-        print(response.text)
         return remote_id
 
 
@@ -189,19 +459,17 @@ class PositionManager(BaseModel):
                    plan_type: PlanType.type,
                    trigger_price: Decimal,
                    direction: PositionDirection.type,
-                   quantity: Decimal):
+                   quantity: Decimal,
+                   client_oid: str = None):
         method = "POST"
         request_path = "/api/mix/v1/plan/placeTPSL"
         body = (f'{{"symbol":"{coin}",'
                 f'"marginCoin":"USDT",'
                 f'"planType":"{plan_type}",'
+                + (f'"clientOid":"{client_oid}",' if client_oid else '') +
                 f'"triggerPrice":"{round(trigger_price, 6)}",'
                 f'"holdSide":"{direction}"}}')
-        headers = self.create_header(method=method, request_path=request_path, body=body)
-        response = requests.post(url="https://api.coincatch.com/api/mix/v1/plan/placeTPSL",
-                                 data=body,
-                                 headers=headers)
-        print(response.text)
+        response = self._send(method=method, request_path=request_path, body=body)
         remote_id = interpret_response(response.json(), "orderId")
         return remote_id
 
@@ -220,13 +488,8 @@ class PositionManager(BaseModel):
                 f'"planType":"{plan_type}",'
                 f'"triggerPrice":"{round(trigger_price, 6)}",'
                 f'"orderId":"{remote_id}"}}')
-        headers = self.create_header(method=method, request_path=request_path, body=body)
-        response = requests.post(url="https://api.coincatch.com/api/mix/v1/plan/modifyTPSLPlan",
-                                 data=body,
-                                 headers=headers)
-        print(response.text)
+        response = self._send(method=method, request_path=request_path, body=body)
         response_code = response.json().get('code', None)
-        print(f"response_code is {response_code}")
         if response.status_code == 200:
             if response_code == '00000':
                 return True
@@ -243,11 +506,7 @@ class PositionManager(BaseModel):
                 f'"marginCoin":"USDT",'
                 f'"planType":"{sltporder.plan_type}",'
                 f'"orderId":"{sltporder.remote_id}"}}')
-        headers = self.create_header(method=method, request_path=request_path, body=body)
-        response = requests.post(url="https://api.coincatch.com/api/mix/v1/plan/cancelPlan",
-                                 data=body,
-                                 headers=headers)
-        print(response.text)
+        response = self._send(method=method, request_path=request_path, body=body)
         if response.status_code == 200:
             return True
         else:
@@ -255,36 +514,35 @@ class PositionManager(BaseModel):
 
 
     def get_price(self, coin: Coin.type):
+        """CoinCatch's mark price, which TP/SL plans trigger on; another venue's perpetual mark when it fails."""
         method = "GET"
         request_path = "/api/mix/v1/market/mark-price"
         query_string = f'symbol={coin}'
-        headers = self.create_header(method=method, request_path=request_path, query_string=query_string)
-        response = requests.get(url="https://api.coincatch.com/api/mix/v1/market/mark-price" + "?" + query_string,
-                                headers=headers)
-        print(response.text)
-        if response.status_code != 200:
-            raise Exception("Error in get price!")
-        return Decimal(response.json().get('data').get('markPrice'))
+        try:
+            response = self._send(method=method, request_path=request_path, query_string=query_string)
+            if response.status_code == 200:
+                return Decimal(response.json().get('data').get('markPrice'))
+            error = f"HTTP {response.status_code}"
+        except (requests.RequestException, CircuitOpen) as e:
+            error = repr(e)
+        logger.warning("Mark price from CoinCatch failed, asking the market data venues", extra={"error": error})
+        from ExchangeAPI.MarketData import get_router
+        return Decimal(str(get_router().fetch_mark_price(coin.removesuffix("_UMCBL"))))
 
 
     def get_order_detail(self, coin: Coin.type, remote_id: str):
         method = "GET"
         request_path = "/api/mix/v1/order/detail"
         query_string = f'symbol={coin}&orderId={remote_id}'
-        headers = self.create_header(method=method, request_path=request_path, query_string=query_string)
-        response = requests.get(url="https://api.coincatch.com/api/mix/v1/order/detail" + "?" + query_string,
-                                headers=headers)
-        print(response.json())
+        response = self._send(method=method, request_path=request_path, query_string=query_string)
+        return response.json().get('data')
 
 
     def get_position_order_information(self, coin: Coin.type, remote_id: str):
         method = "GET"
         request_path = "/api/mix/v1/order/fills"
         query_string = f'symbol={coin}&orderId={remote_id}'
-        headers = self.create_header(method=method, request_path=request_path, query_string=query_string)
-        response = requests.get(url="https://api.coincatch.com/api/mix/v1/order/fills" + "?" + query_string,
-                                headers=headers)
-        print(response.json())
+        response = self._send(method=method, request_path=request_path, query_string=query_string)
         try:
             data = interpret_response(dictionary=response.json())[0]
         except IndexError:
@@ -300,12 +558,195 @@ class PositionManager(BaseModel):
         }
         return output
 
+    def find_order(self, coin: Coin.type, client_oid: str):
+        """The order placed with `client_oid`, or None when the exchange has no such order."""
+        method = "GET"
+        request_path = "/api/mix/v1/order/detail"
+        query_string = f'symbol={coin}&clientOid={client_oid}'
+        response = self._send(method=method, request_path=request_path, query_string=query_string)
+        if response.json().get('code') == ORDER_NOT_FOUND:
+            return None
+        interpret_response(response.json(), "orderId")
+        return response.json().get('data')
+
+    def find_plan(self, coin: Coin.type, client_oid: str):
+        """The untriggered TP/SL plan placed with `client_oid`, or None."""
+        method = "GET"
+        request_path = "/api/mix/v1/plan/currentPlan"
+        query_string = f'symbol={coin}&isPlan=profit_loss'
+        response = self._send(method=method, request_path=request_path, query_string=query_string)
+        plans = interpret_response(dictionary=response.json())
+        return next((plan for plan in plans if plan.get('clientOid') == client_oid), None)
+
     def get_sltp_order_information(self, coin: Coin.type, remote_id: str):
         method = "GET"
         request_path = "/api/mix/v1/order/detail"
         query_string = f'symbol={coin}&orderId={remote_id}'
-        headers = self.create_header(method=method, request_path=request_path, query_string=query_string)
-        response = requests.get(url="https://api.coincatch.com/api/mix/v1/order/detail" + "?" + query_string,
-                                headers=headers)
-        print(response.json())
+        response = self._send(method=method, request_path=request_path, query_string=query_string)
+        return response.json().get('data')
+
+    def get_fills(self, coin: Coin.type, start_time: int, end_time: int, last_end_id: str = None):
+        method = "GET"
+        request_path = "/api/mix/v1/order/fills"
+        query_string = f'symbol={coin}&startTime={start_time}&endTime={end_time}'
+        if last_end_id is not None:
+            query_string += f'&lastEndId={last_end_id}'
+        response = self._send(method=method, request_path=request_path, query_string=query_string)
+        return interpret_response(dictionary=response.json())
+
+
+class Fill(models.Model):
+    position_manager = models.ForeignKey(PositionManager, on_delete=models.CASCADE, related_name='fills')
+    trade_id = models.CharField(max_length=100)
+    order_id = models.CharField(max_length=100)
+    symbol = models.CharField(max_length=50)
+    side = models.CharField(max_length=30)
+    price = models.DecimalField(decimal_places=10, max_digits=30)
+    size = models.DecimalField(decimal_places=10, max_digits=30)
+    fee = models.DecimalField(decimal_places=10, max_digits=30)
+    fill_amount = models.DecimalField(decimal_places=10, max_digits=30)
+    profit = models.DecimalField(decimal_places=10, max_digits=30)
+    fill_time = models.BigIntegerField()
+    day = models.DateField()
+
+    class Meta:
+        db_table = 'fills'
+        unique_together = (('position_manager', 'trade_id'),)
+        indexes = [
+            models.Index(fields=['position_manager', 'symbol', 'fill_time']),
+            models.Index(fields=['order_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} - {self.trade_id}"
+
 
+class FillDailySummary(models.Model):
+    position_manager = models.ForeignKey(PositionManager, on_delete=models.CASCADE, related_name='daily_summaries')
+    symbol = models.CharField(max_length=50)
+    day = models.DateField()
+    fill_count = models.IntegerField(default=0)
+    volume = models.DecimalField(decimal_places=10, max_digits=30, default=0)
+    fees = models.DecimalField(decimal_places=10, max_digits=30, default=0)
+    profit = models.DecimalField(decimal_places=10, max_digits=30, default=0)
+    wins = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'fill_daily_summaries'
+        unique_together = (('position_manager', 'symbol', 'day'),)
+        indexes = [
+            models.Index(fields=['day']),
+            models.Index(fields=['symbol', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} - {self.day}"
+
+
+class TradeTrace(models.Model):
+    position_manager = models.ForeignKey(PositionManager, on_delete=models.CASCADE, related_name='trade_traces')
+    order_sequence = models.IntegerField()
+    candle_close = models.BigIntegerField(null=True, blank=True)
+    started = models.BigIntegerField()
+    duration_us = models.BigIntegerField()
+    # [name, offset_us, duration_us, depth, error] per span, ordered by offset.
+    spans = models.JSONField(default=list)
+
+    class Meta:
+        db_table = 'trade_traces'
+        indexes = [
+            models.Index(fields=['position_manager', 'started']),
+        ]
+
+    def __str__(self):
+        return f"{self.position_manager_id} - {self.order_sequence}"
+
+
+class PaperVariant(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    symbol = models.ForeignKey(Symbol, on_delete=models.CASCADE)
+    interval = models.BigIntegerField()
+    streak_length = models.IntegerField(default=3)
+    tp_percentage = models.FloatField(default=8)
+    sl_percentage = models.FloatField(default=1)
+    quantity_usdt = models.FloatField(default=50)
+    enabled = models.BooleanField(default=True)
+    timestamp_cursor = models.BigIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'paper_variants'
+
+    def __str__(self):
+        return self.name
+
+
+class PaperPosition(models.Model):
+    variant = models.ForeignKey(PaperVariant, on_delete=models.CASCADE, related_name='positions')
+    direction = models.CharField(max_length=10)
+    signal_time = models.BigIntegerField()
+    entry_time = models.BigIntegerField()
+    entry_price = models.FloatField()
+    quantity = models.FloatField()
+    tp_price = models.FloatField()
+    sl_price = models.FloatField()
+    exit_time = models.BigIntegerField(null=True, blank=True)
+    exit_price = models.FloatField(null=True, blank=True)
+    outcome = models.CharField(max_length=10, null=True, blank=True)
+    pnl_percentage = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'paper_positions'
+        indexes = [
+            models.Index(fields=['variant', 'exit_time']),
+        ]
+
+    def __str__(self):
+        return f"{self.variant} - {self.signal_time}"
+
+
+class UniverseRanking(models.Model):
+    day = models.DateField()
+    interval = models.BigIntegerField()
+    symbol = models.ForeignKey(Symbol, on_delete=models.CASCADE)
+    rank = models.IntegerField(null=True, blank=True)
+    score = models.FloatField(null=True, blank=True)
+    volatility = models.FloatField(null=True, blank=True)
+    usdt_volume = models.FloatField(null=True, blank=True)
+    mean_correlation = models.FloatField(null=True, blank=True)
+    coverage = models.FloatField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'universe_rankings'
+        unique_together = (('day', 'interval', 'symbol'),)
+        indexes = [
+            models.Index(fields=['interval', 'day', 'rank']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.symbol} - {self.rank}"
+
+
+class BacktestResult(models.Model):
+    symbol = models.ForeignKey(Symbol, on_delete=models.CASCADE)
+    interval = models.BigIntegerField()
+    start_time = models.BigIntegerField()
+    end_time = models.BigIntegerField()
+    code_version = models.CharField(max_length=64)
+    params_hash = models.CharField(max_length=64)
+    params = models.JSONField(default=dict)
+    data_fingerprint = models.CharField(max_length=64)
+    last_open_time = models.BigIntegerField(null=True, blank=True)
+    candle_count = models.IntegerField(default=0)
+    trades = models.BinaryField()
+    summary = models.JSONField(default=dict)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'backtest_results'
+        unique_together = (('symbol', 'interval', 'start_time', 'code_version', 'params_hash'),)
+
+    def __str__(self):
+        return f"{self.symbol} - {self.interval} - {self.params}"
@@ -0,0 +1,112 @@
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+class QueryRecorder:
+    """Counts the queries the current thread sends through Django, with their total durations."""
+
+    def __init__(self):
+        self.queries = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            entry = self.queries[sql]
+            entry[0] += 1
+            entry[1] += time.perf_counter() - started
+
+    @contextmanager
+    def record(self):
+        with connection.execute_wrapper(self):
+            yield self
+
+    def totals(self):
+        return sum(count for count, _ in self.queries.values()), sum(seconds for _, seconds in self.queries.values())
+
+    def top(self, limit=10):
+        return sorted(((sql, count, seconds) for sql, (count, seconds) in self.queries.items()),
+                      key=lambda query: query[2], reverse=True)[:limit]
+
+
+class StackSampler:
+    """Samples one thread's stack at a fixed interval and keeps the counts as folded stacks."""
+
+    def __init__(self, interval=0.001, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        """Brendan Gregg's folded format, as read by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profile(func, profiler="cprofile", interval=0.001, memory_frames=10):
+    """Run `func` once under the chosen profiler, tracemalloc and a query recorder."""
+    recorder = QueryRecorder()
+    tracemalloc.start(memory_frames)
+    started = time.perf_counter()
+    try:
+        with recorder.record():
+            if profiler == "cprofile":
+                sampler = None
+                stats = cProfile.Profile()
+                stats.runcall(func)
+            else:
+                stats = None
+                with StackSampler(interval) as sampler:
+                    func()
+        elapsed = time.perf_counter() - started
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds": elapsed,
+        "stats": stats,
+        "sampler": sampler,
+        "queries": recorder,
+        "memory": snapshot,
+        "peak_memory": peak,
+    }
+
+
+def format_stats(stats, limit=25, sort="cumulative"):
+    stream = io.StringIO()
+    pstats.Stats(stats, stream=stream).strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
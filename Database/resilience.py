@@ -0,0 +1,119 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+from .exceptions import DeadlineExceeded, CircuitOpen
+
+_current_deadline = ContextVar('deadline', default=None)
+
+# Transaction control and session settings always run, so an expired deadline still rolls back cleanly.
+UNGUARDED_SQL = ("SAVEPOINT", "RELEASE", "ROLLBACK", "COMMIT", "BEGIN", "SET", "RESET")
+
+
+class Deadline:
+    """Time budget of one task run, shared by every exchange and DB call made inside `activate()`."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def check(self):
+        if self.remaining() <= 0:
+            raise DeadlineExceeded
+
+    def timeout(self, cap=None):
+        self.check()
+        remaining = self.remaining()
+        return min(remaining, cap) if cap is not None else remaining
+
+    @contextmanager
+    def activate(self):
+        token = _current_deadline.set(self)
+        try:
+            with connection.execute_wrapper(self._guard_query):
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET statement_timeout = %s", [max(int(self.remaining() * 1000), 1)])
+                try:
+                    yield self
+                finally:
+                    if connection.vendor == 'postgresql' and connection.connection is not None:
+                        with connection.cursor() as cursor:
+                            cursor.execute("RESET statement_timeout")
+        finally:
+            _current_deadline.reset(token)
+
+    def _guard_query(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(UNGUARDED_SQL):
+            self.check()
+        return execute(sql, params, many, context)
+
+
+def current_deadline():
+    return _current_deadline.get()
+
+
+def request_timeout(cap=None):
+    """Timeout for one HTTP call: the configured cap, shortened to whatever the active deadline has left."""
+    cap = cap if cap is not None else settings.EXCHANGE_REQUEST_TIMEOUT
+    deadline = current_deadline()
+    return deadline.timeout(cap) if deadline is not None else cap
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets one probe through after `reset_timeout`."""
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.probing:
+                raise CircuitOpen(f"Circuit for {self.name} is open")
+            self.probing = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def release(self):
+        """End a probe that never reached the endpoint, leaving the next call to probe again."""
+        with self.lock:
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name,
+                                             failure_threshold=settings.CIRCUIT_BREAKER_FAILURES,
+                                             reset_timeout=settings.CIRCUIT_BREAKER_RESET_SECONDS)
+        return _breakers[name]
@@ -0,0 +1,150 @@
+import csv
+import gzip
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.db.models.functions import Coalesce, Least
+
+from . import cache
+from .models import Candle, CandleSyncState, CANDLE_FIELDS
+
+
+def rollup(symbol, source_ms, target_ms, before, since=None, buckets_per_batch=1000):
+    """Aggregate source candles older than `before` into target-interval candles.
+
+    Only buckets holding every one of their `target_ms // source_ms` source candles are written, replacing any
+    target row already there. `since` is where the previous run stopped: below it only the candles it kept are
+    left, so they are read as one batch and the scan proper resumes there. Returns the number of rows written and
+    the open times of the incomplete buckets, whose source candles must be kept.
+    """
+    if since is None:
+        since = Candle.unordered_objects.filter(symbol_id=symbol, interval=source_ms).aggregate(
+            oldest=Min('open_time'))['oldest']
+        if since is None:
+            return 0, set()
+    since -= since % target_ms
+
+    written = 0
+    oldest = None
+    incomplete = set()
+    window = target_ms * buckets_per_batch
+    batches = [Candle.objects.load_arrays(symbol, source_ms, None, min(since, before) - 1)]
+    # Windows are aligned to target buckets so no bucket is ever split across two reads.
+    batches += (Candle.objects.load_arrays(symbol, source_ms, window_start, min(window_start + window, before) - 1)
+                for window_start in range(since, before, window))
+    for candles in batches:
+        if not len(candles):
+            continue
+        rows, kept = _aggregate(candles, source_ms, target_ms)
+        incomplete.update(kept)
+        if not len(rows):
+            continue
+        result = Candle.objects.bulk_create([
+            Candle(symbol_id=symbol, interval=target_ms, **dict(zip(CANDLE_FIELDS, row)))
+            for row in rows.tolist()
+        ], update_conflicts=True, unique_fields=['open_time', 'symbol', 'interval'],
+            update_fields=[field for field in CANDLE_FIELDS if field != 'open_time'])
+        written += len(result)
+        oldest = int(rows[0, 0]) if oldest is None else min(oldest, int(rows[0, 0]))
+    if oldest is not None:
+        CandleSyncState.objects.filter(symbol_id=symbol, interval=target_ms).update(
+            oldest_open_time=Least(Coalesce('oldest_open_time', oldest), oldest))
+    cache.bump_version(symbol, target_ms)
+    return written, incomplete
+
+
+def _aggregate(candles, source_ms, target_ms):
+    """Target rows of the complete buckets in `candles`, and the open times of the incomplete ones."""
+    buckets = candles['open_time'] - candles['open_time'] % target_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+    complete = ends - starts + 1 == target_ms // source_ms
+    rows = np.column_stack([
+        buckets[starts],
+        candles['open'][starts],
+        np.maximum.reduceat(candles['high'], starts),
+        np.minimum.reduceat(candles['low'], starts),
+        candles['close'][ends],
+        np.add.reduceat(candles['base_volume'], starts),
+        np.add.reduceat(candles['usdt_volume'], starts),
+        np.add.reduceat(candles['quote_volume'], starts),
+    ])[complete]
+    return rows, buckets[starts[~complete]].tolist()
+
+
+def purge(symbol, interval_ms, before, batch_size, pause_seconds, archive_dir=None, keep=(), bucket_ms=None):
+    """Delete (optionally archiving first) candles older than `before` in small, throttled transactions.
+
+    Candles in a `bucket_ms` bucket whose open time is in `keep` are left in place.
+    """
+    deleted = 0
+    cursor = None
+    while True:
+        with transaction.atomic():
+            batch = Candle.unordered_objects.filter(
+                symbol_id=symbol,
+                interval=interval_ms,
+                open_time__lt=before
+            )
+            if cursor is not None:
+                batch = batch.filter(open_time__gt=cursor)
+            rows = list(batch.order_by('open_time').values_list('pk', 'open_time')[:batch_size])
+            if not rows:
+                break
+            cursor = rows[-1][1]
+            ids = [pk for pk, open_time in rows if not keep or open_time - open_time % bucket_ms not in keep]
+            if ids:
+                doomed = Candle.unordered_objects.filter(pk__in=ids)
+                if archive_dir is not None:
+                    _archive(archive_dir, symbol, interval_ms, doomed.order_by('open_time').values_list(*CANDLE_FIELDS))
+                deleted += doomed.delete()[0]
+        time.sleep(pause_seconds)
+    _refresh_oldest(symbol, interval_ms)
+    if deleted:
+        cache.bump_version(symbol, interval_ms)
+    return deleted
+
+
+def _archive(archive_dir, symbol, interval_ms, rows):
+    path = Path(archive_dir) / f"{symbol}_{interval_ms}.csv.gz"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, 'at', newline='') as archive:
+        csv.writer(archive).writerows(rows)
+
+
+def _refresh_oldest(symbol, interval_ms):
+    oldest = Candle.unordered_objects.filter(symbol_id=symbol, interval=interval_ms).aggregate(
+        oldest=Min('open_time'))['oldest']
+    CandleSyncState.objects.filter(symbol_id=symbol, interval=interval_ms).update(oldest_open_time=oldest)
+
+
+def enforce(now_ms, intervals):
+    """Apply settings.CANDLE_RETENTION to every synced series. `intervals` maps interval names to ms."""
+    report = []
+    for state in CandleSyncState.objects.all():
+        name = next((name for name, ms in intervals.items() if ms == state.interval), None)
+        policy = settings.CANDLE_RETENTION.get(name)
+        if policy is None:
+            continue
+        target_ms = intervals[policy['rollup_to']] if policy.get('rollup_to') else None
+        before = now_ms - policy['keep_days'] * 24 * 60 * 60 * 1000
+        if target_ms is not None:
+            before -= before % target_ms
+            rolled, incomplete = rollup(state.symbol_id, state.interval, target_ms, before, since=state.rolled_up_until)
+        else:
+            rolled, incomplete = 0, set()
+        # Candles of incomplete buckets stay until a backfill fills the gap and a later run rolls them up.
+        deleted = purge(state.symbol_id, state.interval, before,
+                        batch_size=settings.CANDLE_RETENTION_BATCH_SIZE,
+                        pause_seconds=settings.CANDLE_RETENTION_PAUSE_SECONDS,
+                        archive_dir=settings.CANDLE_ARCHIVE_DIR,
+                        keep=incomplete, bucket_ms=target_ms)
+        if target_ms is not None:
+            CandleSyncState.objects.filter(pk=state.pk).update(rolled_up_until=before)
+        report.append({'symbol': state.symbol_id, 'interval': name, 'rolled_up': rolled, 'deleted': deleted,
+                       'kept_incomplete': len(incomplete)})
+    return report
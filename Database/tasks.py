@@ -1,159 +1,500 @@
-import datetime
+from datetime import datetime, timezone
 from decimal import Decimal
+from contextlib import nullcontext
+from pathlib import Path
 import time
 
-from Database.models import PositionManager, Candle, Coin, SideFutures, PlanType, PositionDirection
+from Database import backfill, ledger, log, retention, tracing
+from Database.clock import system_clock
+from Database.exceptions import WrongActionBasedOnState, ExchangeRejected, DeadlineExceeded, CircuitOpen
+from Database.models import PositionManager, Candle, CandleSchedule, Coin, SideFutures, PlanType, PositionDirection, \
+    State, Symbol, BackfillJob, BackfillChunk, BackfillStatus, PaperVariant
+from Database.resilience import Deadline, current_deadline
+from Database.utils import get_redis
+import logging
+from ExchangeAPI import TickStore
 from ExchangeAPI.APICallManager import Interval, CandleAgent
-from celery import shared_task
+from Strategies import Backtest, BacktestStore, Screening
+from Strategies.PaperTrading import PaperTrader
+from celery import shared_task, chord, group
+from celery.signals import before_task_publish, task_prerun, task_postrun
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone as dj_timezone
+import requests
 
 
 sl_percentage = 1
 tp_percentage = 8
+streak_length = 3
+
+SYMBOL = "DOGEUSDT"
+INTERVAL = Interval.HOUR_1
+COIN = Coin.doge_futures.value
+
+# Errors that prove the leg being placed never reached the exchange, or was refused by it.
+NOTHING_PLACED = (ExchangeRejected, DeadlineExceeded, CircuitOpen)
+# Trace span of each leg of an open attempt.
+SPANS = {"open": "futures_trade", "entry_price": "entry_price", "tp": "place_tp", "sl": "place_sl"}
+
+logger = logging.getLogger(__name__)
+
+
+def _task_deadline(name):
+    """The task's own deadline, or the caller's when it runs inside another task's."""
+    if current_deadline() is not None:
+        return nullcontext()
+    return Deadline(settings.TASK_DEADLINE_SECONDS[name]).activate()
+
 
 @shared_task
-def check_candles_and_open():
-    position_manager = PositionManager.objects.get()
-    if position_manager.is_position_active:
+def check_candles_and_open(ingest=True):
+    with _task_deadline("check_candles_and_open"):
+        position_manager = PositionManager.objects.get()
+        run_check_candles_and_open(position_manager=position_manager,
+                                   agent=CandleAgent(symbol=SYMBOL, interval=INTERVAL) if ingest else None)
+
+
+@shared_task
+def check_position():
+    with _task_deadline("check_position"):
+        position_manager = PositionManager.objects.get()
+        run_check_position(position_manager=position_manager)
+
+
+@shared_task(bind=True)
+def my_task(self):
+    if is_stale_tick(self):
         return
+    with Deadline(settings.TICK_DEADLINE_SECONDS).activate():
+        check_position()
+        check_candles_and_open()
 
-    agent = CandleAgent(symbol="DOGEUSDT", interval=Interval.HOUR_1)
-    new_candles = agent.fetch_future_candles()
-    agent.save_to_db(candles=new_candles)
-
-    candles = Candle.objects.filter(
-        symbol__symbol="DOGEUSDT",
-        interval=Interval.HOUR_1.value[1],
-        open_time__gt=position_manager.timestamp_cursor
-    ).order_by("-open_time")
-
-    red_count = 0
-    red_interrupt = False
-    green_count = 0
-    green_interrupt = False
-    for candle in candles:
-        if not candle.is_green():
-            red_count += 1
-            green_interrupt = True
-        elif candle.is_green():
-            green_count += 1
-            red_interrupt = True
-
-        if red_interrupt and green_interrupt:
-            break
-
-        if red_count == 3 or green_count == 3:
-            break
-
-    price = position_manager.get_price(coin=Coin.doge_futures.value)
-    quantity = Decimal(50 / price)
-
-    if red_count == 3:
-
-        position_manager.futures_trade(
-            coin=Coin.doge_futures.value,
-            quantity=quantity,
-            side=SideFutures.open_short.value
-        )
 
+@shared_task
+def evaluate_closed_candle():
+    """Run the strategy on candles already stored, for ticks driven by candle events.
 
-        price = position_manager.get_price(coin=Coin.doge_futures.value)
-        sl_price = price * Decimal(1 + sl_percentage / 100)
-        tp_price = price * Decimal(1 - tp_percentage / 100)
+    It never ingests, so it never publishes the events that trigger it.
+    """
+    with Deadline(settings.TICK_DEADLINE_SECONDS).activate():
+        check_position()
+        check_candles_and_open(ingest=False)
 
-        time.sleep(1)
-
-        print("p" + f'{price}')
-        print("sl_price" + f'{Decimal(sl_price)}')
-        print("tp_price" + f'{Decimal(tp_price)}')
-        position_manager.place_sltp(
-            coin=Coin.doge_futures.value,
-            plan_type=PlanType.tp.value,
-            trigger_price=Decimal(tp_price),
-            direction=PositionDirection.short.value,
-            quantity=quantity
-        )
 
-        time.sleep(1)
+@shared_task
+def arm_candle_schedules():
+    """Make sure every enabled series has its next candle-close evaluation queued; re-arms lost chains."""
+    with _task_deadline("arm_candle_schedules"):
+        now = system_clock.now_ms()
+        for schedule in CandleSchedule.objects.filter(enabled=True).select_related('symbol'):
+            if schedule.next_fire_time is None or schedule.next_fire_time < now - settings.CANDLE_SCHEDULE_GRACE_MS:
+                _arm(schedule, schedule.next_fire_time, schedule.following_fire_time(now))
 
-        remote_id = position_manager.place_sltp(
-            coin=Coin.doge_futures.value,
-            plan_type=PlanType.sl.value,
-            trigger_price=Decimal(sl_price),
-            direction=PositionDirection.short.value,
-            quantity=quantity
-        )
 
-        position_manager.remote_id = remote_id
-        position_manager.sl_order_price = Decimal(sl_price)
-        position_manager.is_position_active = True
-        position_manager.save(update_fields=["remote_id",
-                                             "is_position_active",
-                                             "sl_order_price",
-                                             "updated"])
-
-    elif green_count == 3:
-        position_manager.futures_trade(
-            coin=Coin.doge_futures.value,
-            quantity=quantity,
-            side=SideFutures.open_long.value
+def _arm(schedule, expected_fire_time, fire_time):
+    # Compare-and-set so overlapping armers never queue the same boundary twice.
+    armed = CandleSchedule.objects.filter(
+        pk=schedule.pk,
+        next_fire_time=expected_fire_time
+    ).update(next_fire_time=fire_time)
+    if armed:
+        evaluate_candle_close.apply_async(
+            args=(schedule.pk, fire_time),
+            eta=datetime.fromtimestamp(fire_time / 1000, tz=timezone.utc),
+            **settings.CANDLE_SCHEDULE_QUEUES[schedule.evaluate_strategy]
         )
 
 
-        price = position_manager.get_price(coin=Coin.doge_futures.value)
+@shared_task
+def evaluate_candle_close(schedule_id, fire_time):
+    schedule = CandleSchedule.objects.select_related('symbol').get(pk=schedule_id)
+    if not schedule.enabled or schedule.next_fire_time != fire_time:
+        return
+    _arm(schedule, fire_time, schedule.following_fire_time(max(fire_time, system_clock.now_ms())))
+
+    interval = next(interval for interval in Interval if interval.to_db_format() == schedule.interval)
+    with Deadline(settings.TICK_DEADLINE_SECONDS).activate():
+        if schedule.evaluate_strategy:
+            check_position()
+            check_candles_and_open()
+        else:
+            agent = CandleAgent(symbol=schedule.symbol.symbol, interval=interval)
+            agent.save_to_db(candles=agent.fetch_future_candles())
+
+
+@shared_task
+def start_backfill(symbol, interval_name, start_time, end_time, chunk_days=20):
+    """Split a range into chunks and load them in parallel; re-running resumes from the unfinished chunks."""
+    with _task_deadline("start_backfill"):
+        interval = Interval[interval_name]
+        job = backfill.plan_job(symbol, interval.to_db_format(), start_time, end_time,
+                                chunk_days * 24 * 60 * 60 * 1000)
+        chunks = list(backfill.pending_chunks(job).values_list('pk', flat=True))
+        BackfillJob.objects.filter(pk=job.pk).update(status=BackfillStatus.Running.value)
+        chord(group(backfill_chunk.s(chunk_id, interval_name) for chunk_id in chunks))(finish_backfill.si(job.pk))
+        return job.pk
+
+
+@shared_task
+def backfill_all_symbols(interval_names, start_time, end_time, chunk_days=20):
+    with _task_deadline("backfill_all_symbols"):
+        for symbol in Symbol.objects.values_list('symbol', flat=True):
+            for interval_name in interval_names:
+                start_backfill.delay(symbol, interval_name, start_time, end_time, chunk_days)
+
+
+@shared_task(autoretry_for=(requests.RequestException,), retry_backoff=True, max_retries=5)
+def backfill_chunk(chunk_id, interval_name):
+    with _task_deadline("backfill_chunk"):
+        chunk = BackfillChunk.objects.select_related('job').get(pk=chunk_id)
+        if chunk.status == BackfillStatus.Complete.value:
+            return 0
+        BackfillChunk.objects.filter(pk=chunk_id).update(status=BackfillStatus.Running.value,
+                                                         attempts=chunk.attempts + 1)
+
+        started = time.monotonic()
+        agent = CandleAgent(symbol=chunk.job.symbol_id, interval=Interval[interval_name])
+        # Errors must reach autoretry: swallowed, they would read as an empty range and complete the chunk.
+        candles = [candle for candle in agent.fetch_candles_range(chunk.start_time, chunk.end_time, raise_errors=True)
+                   if chunk.start_time <= int(candle[0]) < chunk.end_time]
+        agent.save_to_db(candles=candles)
+
+        BackfillChunk.objects.filter(pk=chunk_id).update(status=BackfillStatus.Complete.value,
+                                                         rows=len(candles),
+                                                         duration_ms=int((time.monotonic() - started) * 1000))
+        return len(candles)
+
+
+@shared_task
+def finish_backfill(job_id):
+    with _task_deadline("finish_backfill"):
+        job = BackfillJob.objects.get(pk=job_id)
+        if not backfill.pending_chunks(job).exists():
+            job.status = BackfillStatus.Complete.value
+            job.finished = dj_timezone.now()
+            job.save(update_fields=["status", "finished"])
+        return backfill.progress(job)
+
+
+@shared_task
+def enforce_candle_retention():
+    with _task_deadline("enforce_candle_retention"):
+        return retention.enforce(system_clock.now_ms(),
+                                 {interval.name: interval.to_db_format() for interval in Interval})
+
+
+@shared_task
+def compact_ticks(interval_name="MIN_1", lookback_minutes=120):
+    """Roll recently captured trades into candles; buckets already stored are left alone."""
+    with _task_deadline("compact_ticks"):
+        interval_ms = Interval[interval_name].to_db_format()
+        # Buckets closing within TICK_COMPACT_LAG_MS may still have trades in the capture process's buffer.
+        end_time = system_clock.now_ms() - settings.TICK_COMPACT_LAG_MS
+        root = Path(settings.TICK_STORE_DIR)
+        if not root.exists():
+            return 0
+        return sum(TickStore.compact(root, path.name, interval_ms, end_time - lookback_minutes * 60 * 1000, end_time)
+                   for path in root.iterdir() if path.is_dir())
+
+
+TICK_TASKS = {"Database.tasks.my_task"}
+
+
+@before_task_publish.connect
+def stamp_tick(sender=None, headers=None, **kwargs):
+    if sender in TICK_TASKS and headers is not None:
+        headers["tick"] = get_redis().incr(f"tick:{sender}")
+
+
+@before_task_publish.connect
+def stamp_correlation_id(headers=None, **kwargs):
+    # Tasks queued from inside a task run inherit its correlation ID.
+    current = log.correlation_id.get()
+    if current is not None and headers is not None:
+        headers.setdefault("correlation_id", current)
+
+
+@task_prerun.connect
+def bind_correlation_id(task_id=None, task=None, **kwargs):
+    task.request.correlation_token = log.correlation_id.set(getattr(task.request, "correlation_id", None) or task_id)
+
+
+@task_postrun.connect
+def unbind_correlation_id(task=None, **kwargs):
+    token = getattr(task.request, "correlation_token", None)
+    if token is not None:
+        log.correlation_id.reset(token)
+
+
+def is_stale_tick(task):
+    """True when a newer run of the same tick task has been queued since this one was published."""
+    tick = getattr(task.request, "tick", None)
+    if tick is None:
+        return False
+    latest = int(get_redis().get(f"tick:{task.name}") or 0)
+    return tick < latest
+
+
+@shared_task
+def run_paper_trading():
+    with _task_deadline("run_paper_trading"):
+        return PaperTrader().tick(system_clock.now_ms())
+
+
+@shared_task
+def update_universe_rankings(interval_name=None, days=1):
+    with _task_deadline("update_universe_rankings"):
+        interval = Interval[interval_name or settings.UNIVERSE_INTERVAL]
+        return Screening.update_rankings(interval.to_db_format(), system_clock.now_ms(), days=days)
+
+
+@shared_task
+def revalidate_backtests():
+    """Re-run the live strategy and every enabled paper variant over all closed candles since the fixed start.
+
+    Both trade under the timestamp_cursor rule, so the backtests apply it too (live_cursor).
+    """
+    with _task_deadline("revalidate_backtests"):
+        now = system_clock.now_ms()
+        configs = [("live", SYMBOL, INTERVAL.to_db_format(), tp_percentage, sl_percentage, streak_length)]
+        configs += PaperVariant.objects.filter(enabled=True).values_list(
+            'name', 'symbol_id', 'interval', 'tp_percentage', 'sl_percentage', 'streak_length')
+        summaries = {}
+        for name, symbol, interval, tp, sl, streak in configs:
+            trades = BacktestStore.cached_backtest(symbol, interval, settings.BACKTEST_REVALIDATION_START_TIME,
+                                                   now - interval, tp, sl, streak, intra_candle=True,
+                                                   live_cursor=True)
+            summaries[name] = Backtest.summary(trades, tp, sl)
+        return summaries
+
+
+@shared_task
+def sync_fill_ledger():
+    """Record new fills of every account; one failing account does not hold back the others."""
+    with _task_deadline("sync_fill_ledger"):
+        for position_manager in PositionManager.objects.all():
+            try:
+                ledger.sync_fills(position_manager=position_manager, coin=COIN)
+            except DeadlineExceeded:
+                raise
+            except Exception:
+                logger.exception("Syncing fills failed", extra={"position_manager": position_manager.pk})
+
+
+def run_check_candles_and_open(position_manager, clock=system_clock, agent=None):
+    if position_manager.is_position_active:
+        return
+
+    with tracing.start_trace("open", started_ms=clock.now_ms()) as trace:
+        if agent is not None:
+            with tracing.span("fetch_candles"):
+                new_candles = agent.fetch_future_candles()
+                agent.save_to_db(candles=new_candles)
+
+        with tracing.span("signal"):
+            # A streak decision never needs more than `streak_length` closed candles.
+            candles = list(Candle.objects.filter(
+                symbol__symbol=SYMBOL,
+                interval=INTERVAL.to_db_format(),
+                open_time__gt=position_manager.timestamp_cursor,
+                open_time__lte=clock.now_ms() - INTERVAL.to_db_format()
+            ).order_by("-open_time").values_list("open_time", "direction")[:streak_length])
+
+            red_count = 0
+            red_interrupt = False
+            green_count = 0
+            green_interrupt = False
+            for open_time, candle_direction in candles:
+                if candle_direction < 0:
+                    red_count += 1
+                    green_interrupt = True
+                else:
+                    green_count += 1
+                    red_interrupt = True
+
+                if red_interrupt and green_interrupt:
+                    break
+
+                if red_count == streak_length or green_count == streak_length:
+                    break
+
+        with tracing.span("get_price"):
+            price = position_manager.get_price(coin=COIN)
+        quantity = Decimal(50 / price)
+
+        if red_count == streak_length:
+            direction = PositionDirection.short.value
+        elif green_count == streak_length:
+            direction = PositionDirection.long.value
+        else:
+            return
+        trace.origin_ms = candles[0][0] + INTERVAL.to_db_format()
+
+        # Only the worker that wins the Inactive -> Pending claim may place orders for this account.
+        try:
+            with tracing.span("claim"):
+                position_manager.transition(State.Inactive, State.Pending, pending_since=clock.now_ms(),
+                                            open_attempt={"direction": direction, "quantity": str(quantity),
+                                                          "legs": {}})
+        except WrongActionBasedOnState:
+            return
+        try:
+            _open_position(position_manager, clock)
+        except Exception as error:
+            if isinstance(error, NOTHING_PLACED) and not position_manager.open_attempt["legs"]:
+                _roll_back_open(position_manager)
+            else:
+                logger.error("Open attempt interrupted; resume_pending_opens will finish it",
+                             extra={"legs": position_manager.open_attempt["legs"], "error": repr(error)})
+            raise
+    position_manager.record_trace(trace)
+
+
+def _roll_back_open(position_manager):
+    try:
+        position_manager.transition(State.Pending, State.Inactive, open_attempt=None, pending_since=None)
+    except WrongActionBasedOnState:
+        pass
+
+
+def _place_leg(position_manager, leg, place):
+    """Run `place` unless an earlier try of this attempt already recorded the leg; record its result."""
+    legs = position_manager.open_attempt["legs"]
+    if leg not in legs:
+        with tracing.span(SPANS[leg]):
+            legs[leg] = place()
+        position_manager.save_open_attempt()
+    return legs[leg]
+
+
+def _open_position(position_manager, clock):
+    """Place the legs of the Pending open attempt not placed yet, then activate the account."""
+    attempt = position_manager.open_attempt
+    direction = attempt["direction"]
+    quantity = Decimal(attempt["quantity"])
+    if direction == PositionDirection.short.value:
+        side = SideFutures.open_short.value
+    else:
+        side = SideFutures.open_long.value
+
+    _place_leg(position_manager, "open", lambda: position_manager.futures_trade(
+        coin=COIN,
+        quantity=quantity,
+        side=side,
+        client_oid=position_manager.client_oid("open")
+    ))
+
+    price = Decimal(_place_leg(position_manager, "entry_price",
+                               lambda: str(position_manager.get_price(coin=COIN))))
+    if direction == PositionDirection.short.value:
+        sl_price = price * Decimal(1 + sl_percentage / 100)
+        tp_price = price * Decimal(1 - tp_percentage / 100)
+    else:
         sl_price = price * Decimal(1 - sl_percentage / 100)
         tp_price = price * Decimal(1 + tp_percentage / 100)
 
-        time.sleep(1)
+    if "tp" not in attempt["legs"]:
+        clock.sleep(1)
 
-        position_manager.place_sltp(
-            coin=Coin.doge_futures.value,
-            plan_type=PlanType.tp.value,
-            trigger_price=Decimal(tp_price),
-            direction=PositionDirection.long.value,
-            quantity=quantity
-        )
+    logger.info("Placing TP/SL", extra={"price": str(price), "sl_price": str(sl_price), "tp_price": str(tp_price),
+                                        "direction": direction})
+    _place_leg(position_manager, "tp", lambda: position_manager.place_sltp(
+        coin=COIN,
+        plan_type=PlanType.tp.value,
+        trigger_price=Decimal(tp_price),
+        direction=direction,
+        quantity=quantity,
+        client_oid=position_manager.client_oid("tp")
+    ))
 
-        time.sleep(1)
+    if "sl" not in attempt["legs"]:
+        clock.sleep(1)
 
-        remote_id = position_manager.place_sltp(
-            coin=Coin.doge_futures.value,
-            plan_type=PlanType.sl.value,
-            trigger_price=Decimal(sl_price),
-            direction=PositionDirection.long.value,
-            quantity=quantity
-        )
+    remote_id = _place_leg(position_manager, "sl", lambda: position_manager.place_sltp(
+        coin=COIN,
+        plan_type=PlanType.sl.value,
+        trigger_price=Decimal(sl_price),
+        direction=direction,
+        quantity=quantity,
+        client_oid=position_manager.client_oid("sl")
+    ))
+
+    with tracing.span("activate"):
+        position_manager.transition(State.Pending, State.Active,
+                                    remote_id=remote_id,
+                                    sl_order_price=Decimal(sl_price),
+                                    open_attempt=None,
+                                    pending_since=None)
+
+
+def resume_open(position_manager, clock=system_clock):
+    """Finish, or undo, an open attempt left Pending by a crashed or interrupted worker.
+
+    Legs the exchange has under this attempt's client OIDs are adopted rather than placed again, so the attempt
+    keeps its order_sequence. An attempt whose market order never reached the exchange goes back to Inactive.
+    """
+    attempt = position_manager.open_attempt
+    if attempt is None:
+        # Claimed before attempts were recorded: only safe to undo when nothing was opened.
+        if position_manager.find_order(COIN, position_manager.client_oid("open")) is None:
+            _roll_back_open(position_manager)
+        else:
+            logger.error("Pending account has an open order but no recorded attempt",
+                         extra={"order_sequence": position_manager.order_sequence})
+        return
+    legs = attempt["legs"]
+    if "open" not in legs:
+        order = position_manager.find_order(COIN, position_manager.client_oid("open"))
+        if order is None:
+            _roll_back_open(position_manager)
+            return
+        legs["open"] = order["orderId"]
+    for leg in ("tp", "sl"):
+        if leg not in legs:
+            plan = position_manager.find_plan(COIN, position_manager.client_oid(leg))
+            if plan is not None:
+                legs[leg] = plan["orderId"]
+    position_manager.save_open_attempt()
+    _open_position(position_manager, clock)
 
-        position_manager.remote_id = remote_id
-        position_manager.sl_order_price = Decimal(sl_price)
-        position_manager.is_position_active = True
-        position_manager.save(update_fields=["remote_id",
-                                             "is_position_active",
-                                             "sl_order_price",
-                                             "updated"])
 
 @shared_task
-def check_position():
-    position_manager = PositionManager.objects.get()
+def resume_pending_opens():
+    """Sweep accounts stuck in Pending past PENDING_OPEN_TIMEOUT_MS and resume or roll back their open."""
+    now = system_clock.now_ms()
+    stale = PositionManager.objects.filter(state=State.Pending.value).filter(
+        Q(pending_since__lt=now - settings.PENDING_OPEN_TIMEOUT_MS) | Q(pending_since__isnull=True))
+    for position_manager in stale:
+        # Compare-and-set so two sweeps never resume the same attempt at once.
+        claimed = PositionManager.objects.filter(
+            pk=position_manager.pk,
+            state=State.Pending.value,
+            pending_since=position_manager.pending_since
+        ).update(pending_since=now)
+        if not claimed:
+            continue
+        position_manager.pending_since = now
+        try:
+            with Deadline(settings.TICK_DEADLINE_SECONDS).activate():
+                resume_open(position_manager)
+        except Exception:
+            logger.exception("Resuming pending open failed", extra={"order_sequence": position_manager.order_sequence})
 
+
+def run_check_position(position_manager, clock=system_clock):
     if position_manager.remote_id is None:
         return
     changed = position_manager.modify_sltp(
-        coin=Coin.doge_futures.value,
+        coin=COIN,
         remote_id=position_manager.remote_id,
         plan_type=PlanType.sl.value,
         trigger_price=position_manager.sl_order_price,
     )
     if changed == "Changed":
-        position_manager.is_position_active = False
-        position_manager.remote_id = None
-        position_manager.timestamp_cursor = datetime.datetime.now().timestamp() * 1000
-        position_manager.save(update_fields=["is_position_active",
-                                             "remote_id",
-                                             "timestamp_cursor",
-                                             "updated"])
-
-@shared_task
-def my_task():
-    check_position()
-    time.sleep(1)
-    check_candles_and_open()
+        try:
+            position_manager.transition(State.Active, State.Inactive,
+                                        remote_id=None,
+                                        timestamp_cursor=clock.now_ms())
+        except WrongActionBasedOnState:
+            pass
@@ -0,0 +1,56 @@
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase
+
+from Database import klines
+from Database.models import Candle, CandleSyncState
+
+FIXTURES = Path(__file__).parent / "fixtures"
+MINUTE = 60 * 1000
+FIRST_OPEN_TIME = 1704067200000  # 2024-01-01 00:00 UTC
+
+
+class ParseFileTests(TestCase):
+    def test_csv_without_header(self):
+        records = klines.parse_file(FIXTURES / "BTCUSDT-1m-milliseconds.csv")
+
+        self.assertEqual(records['open_time'].tolist(), [FIRST_OPEN_TIME + i * MINUTE for i in range(5)])
+        self.assertEqual(records[0]['open'], 42000.0)
+        self.assertEqual(records[0]['close'], 42010.0)
+        self.assertEqual(records[0]['base_volume'], 1.5)
+        # Column 7 is the quote asset volume, not the close time in column 6.
+        self.assertEqual(records[0]['usdt_volume'], 63007.5)
+        self.assertEqual(records[0]['quote_volume'], 63007.5)
+
+    def test_zip_with_header_and_microseconds(self):
+        records = klines.parse_file(FIXTURES / "BTCUSDT-1m-microseconds.zip")
+
+        self.assertEqual(records['open_time'].tolist(), [FIRST_OPEN_TIME + i * MINUTE for i in range(5, 10)])
+        np.testing.assert_array_equal(records['usdt_volume'], [63007.5, 105012.5, 147017.5, 189022.5, 231027.5])
+
+
+class LoadTests(TestCase):
+    def test_load_inserts_once_and_records_bounds(self):
+        report = klines.load("BTCUSDT", MINUTE, [FIXTURES], workers=1)
+
+        self.assertEqual((report["files"], report["rows"], report["inserted"]), (2, 10, 10))
+        stored = Candle.objects.filter(symbol_id="BTCUSDT", interval=MINUTE)
+        self.assertEqual(stored.count(), 10)
+        self.assertEqual(stored.get(open_time=FIRST_OPEN_TIME + 9 * MINUTE).usdt_volume, 231027.5)
+        state = CandleSyncState.objects.get(symbol_id="BTCUSDT", interval=MINUTE)
+        self.assertEqual((state.oldest_open_time, state.newest_open_time),
+                         (FIRST_OPEN_TIME, FIRST_OPEN_TIME + 9 * MINUTE))
+
+        again = klines.load("BTCUSDT", MINUTE, [FIXTURES], workers=1)
+        self.assertEqual((again["inserted"], again["duplicates"]), (0, 10))
+
+    def test_command(self):
+        out = StringIO()
+        call_command("load_klines", "BTCUSDT", "MIN_1", str(FIXTURES / "BTCUSDT-1m-milliseconds.csv"),
+                     "--workers", "1", stdout=out)
+
+        self.assertIn("5 inserted", out.getvalue())
+        self.assertEqual(Candle.objects.filter(symbol_id="BTCUSDT", interval=MINUTE).count(), 5)
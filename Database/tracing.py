@@ -0,0 +1,111 @@
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+
+_current = ContextVar("trace", default=None)
+
+
+class Trace:
+    """Spans of one signal-to-order run. Offsets and durations are monotonic microseconds from the trace start."""
+
+    def __init__(self, name, started_ms=None):
+        self.name = name
+        self.started_ms = time.time_ns() // 1_000_000 if started_ms is None else started_ms
+        self.origin_ms = None
+        self.spans = []
+        self._start_ns = time.monotonic_ns()
+        self._depth = 0
+
+    @contextmanager
+    def span(self, name):
+        start = time.monotonic_ns()
+        self._depth += 1
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self._depth -= 1
+            self.spans.append([name, (start - self._start_ns) // 1000, (time.monotonic_ns() - start) // 1000,
+                               self._depth, int(error)])
+
+    def duration_us(self):
+        return (time.monotonic_ns() - self._start_ns) // 1000
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "started": self.started_ms,
+            "origin": self.origin_ms,
+            "spans": sorted(self.spans, key=lambda span: span[1]),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+
+@contextmanager
+def start_trace(name, started_ms=None):
+    trace = Trace(name, started_ms)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def span(name):
+    """Time a stage of the active trace; a no-op outside one."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+
+def export_jsonl(queryset, stream):
+    """Write one JSON object per trade trace, spans included."""
+    count = 0
+    for trade_trace in queryset.order_by("started").iterator():
+        stream.write(json.dumps({
+            "position_manager": trade_trace.position_manager_id,
+            "order_sequence": trade_trace.order_sequence,
+            "candle_close": trade_trace.candle_close,
+            "started": trade_trace.started,
+            "duration_us": trade_trace.duration_us,
+            "spans": trade_trace.spans,
+        }, separators=(",", ":")) + "\n")
+        count += 1
+    return count
+
+
+def latency_report(queryset, percentiles=(50, 90, 99)):
+    """Per-stage latency percentiles in milliseconds, plus candle close -> start and the whole run."""
+    samples = {"candle_close_to_start": [], "total": []}
+    for started, candle_close, duration_us, spans in queryset.values_list(
+            "started", "candle_close", "duration_us", "spans").iterator():
+        if candle_close is not None:
+            samples["candle_close_to_start"].append(started - candle_close)
+        samples["total"].append(duration_us / 1000)
+        for name, _, span_us, _, _ in spans:
+            samples.setdefault(name, []).append(span_us / 1000)
+
+    report = {}
+    for name, values in samples.items():
+        if not values:
+            continue
+        values = np.asarray(values, dtype=np.float64)
+        report[name] = {"count": len(values), "max": float(values.max()),
+                        **{f"p{p}": float(np.percentile(values, p)) for p in percentiles}}
+    return report
@@ -1,4 +1,16 @@
-from .exceptions import WrongRequest, KeyNotFound, NoResponse, UnknownTypeData
+import redis
+from django.conf import settings
+
+from .exceptions import WrongRequest, KeyNotFound, NoResponse, UnknownTypeData, ExchangeRejected
+
+_redis = None
+
+
+def get_redis():
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis
 
 
 def interpret_response(dictionary, key: str = "", return_none=False):
@@ -23,7 +35,7 @@ def interpret_response(dictionary, key: str = "", return_none=False):
     elif msg is None:
         raise NoResponse
     else:
-        raise Exception(msg)
+        raise ExchangeRejected(msg)
 
 
 def get_param(dictionary, key: str, return_none=True):
@@ -1,12 +1,19 @@
+import logging
+
+import numpy as np
 import requests
 from datetime import datetime, timedelta
 from enum import Enum
 import time
-from django.db import transaction
+from django.db import transaction, IntegrityError
+from django.db.models import Min, Max, Q
 
-from Database.models import Symbol, Candle
+from Database import cache, events
+from Database.models import Symbol, Candle, CandleSyncState, BackfillStatus
+from Database.resilience import current_deadline
+from ExchangeAPI.MarketData import get_router
 
-BASE_URL = "https://api.bitget.com/api/v2/spot/market/history-candles"
+logger = logging.getLogger(__name__)
 
 
 class Interval(Enum):
@@ -29,9 +36,10 @@ class Interval(Enum):
 
 
 class CandleAgent:
-    def __init__(self, symbol="BTCUSDT", interval=Interval.MIN_15):
+    def __init__(self, symbol="BTCUSDT", interval=Interval.MIN_15, router=None):
         self.interval = interval
         self.symbol = self._validate_symbol(symbol)
+        self.router = router or get_router()
 
     def _validate_symbol(self, symbol):
         try:
@@ -46,55 +54,96 @@ class CandleAgent:
         start_time = int((datetime.now() - timedelta(days=days, hours=hours)).timestamp() * 1000)
         return start_time, end_time
 
-    def fetch_candles(self, end_time, limit=100):
-        query_string = f"?symbol={self.symbol}&granularity={self.interval.api_format()}&endTime={end_time}&limit={limit}"
-        url = BASE_URL + query_string
+    def fetch_candles(self, end_time, limit=100, raise_errors=False):
+        """Candles up to end_time; a failed request is logged and read as no candles unless `raise_errors`."""
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
-            if data.get("code") == "00000" and isinstance(data.get("data"), list):
-                return data["data"]
-            print(f"Error: {data.get('msg', 'Unknown error')}")
-            return []
-        except requests.RequestException as e:
-            print(f"Request failed: {e}")
+            return self.router.fetch_candles(self.symbol, self.interval, end_time, limit)
+        except (requests.RequestException, ValueError) as e:
+            if raise_errors:
+                raise
+            logger.warning("Candle request failed", extra={"symbol": self.symbol, "error": str(e)})
             return []
 
-    def fetch_past_candles(self, days=30, hours=0, limit=100):
-        oldest_candle = Candle.objects.filter(
+    def get_sync_state(self, for_update=False):
+        queryset = CandleSyncState.objects.select_for_update() if for_update else CandleSyncState.objects
+        try:
+            return queryset.get(symbol_id=self.symbol, interval=self.interval.to_db_format())
+        except CandleSyncState.DoesNotExist:
+            self._create_sync_state()
+            return queryset.get(symbol_id=self.symbol, interval=self.interval.to_db_format())
+
+    def _create_sync_state(self):
+        # One-time seed from the candles already stored before the sync table existed.
+        closed_before = int(datetime.now().timestamp() * 1000) - self.interval.to_db_format()
+        bounds = Candle.unordered_objects.filter(
             symbol__symbol=self.symbol,
             interval=self.interval.to_db_format()
-        ).first()
+        ).aggregate(
+            oldest=Min('open_time'),
+            newest=Max('open_time'),
+            last_closed=Max('open_time', filter=Q(open_time__lte=closed_before))
+        )
+        try:
+            with transaction.atomic():
+                CandleSyncState.objects.create(
+                    symbol_id=self.symbol,
+                    interval=self.interval.to_db_format(),
+                    oldest_open_time=bounds['oldest'],
+                    newest_open_time=bounds['newest'],
+                    last_closed_open_time=bounds['last_closed'],
+                )
+        except IntegrityError:
+            pass
+
+    def fetch_past_candles(self, days=30, hours=0, limit=100):
+        state = self.get_sync_state()
 
-        if not oldest_candle:
-            print("No data in database for this symbol and interval. Use fetch_candles_range instead.")
+        if state.oldest_open_time is None:
+            logger.warning("No data in database for this symbol and interval. Use fetch_candles_range instead.",
+                           extra={"symbol": self.symbol, "interval": self.interval.name})
             return []
 
-        end_time = oldest_candle.open_time
+        end_time = state.oldest_open_time
         start_time = int(
             (datetime.fromtimestamp(end_time / 1000) - timedelta(days=days, hours=hours)).timestamp() * 1000)
-        return self.fetch_candles_range(start_time, end_time, limit)
+        try:
+            candles = [candle for candle in self.fetch_candles_range(start_time, end_time, limit, raise_errors=True)
+                       if int(candle[0]) < end_time]
+        except (requests.RequestException, ValueError) as e:
+            logger.warning("Past candle request failed", extra={"symbol": self.symbol, "error": str(e)})
+            return []
+        # Only an answer from the venue, never a failed request, shows there is no older data.
+        if not candles:
+            CandleSyncState.objects.filter(pk=state.pk).update(backfill_status=BackfillStatus.Complete.value)
+        return candles
 
     def fetch_future_candles(self, limit=100):
-        newest_candle = Candle.objects.filter(
-            symbol__symbol=self.symbol,
-            interval=self.interval.to_db_format()
-        ).last()
+        state = self.get_sync_state()
+        last_closed = state.last_closed_open_time
+        if last_closed is None:
+            last_closed = state.newest_open_time - self.interval.to_db_format() if state.newest_open_time else None
+
+        if last_closed is None:
+            logger.warning("No data in database for this symbol and interval. Use fetch_candles_range instead.",
+                           extra={"symbol": self.symbol, "interval": self.interval.name})
+            return []
 
-        if not newest_candle:
-            print("No data in database for this symbol and interval. Use fetch_candles_range instead.")
+        # Only candles opened strictly between the last closed one and the currently forming one are new.
+        interval_ms = self.interval.to_db_format()
+        now = int(datetime.now().timestamp() * 1000)
+        end_time = last_closed + interval_ms * ((now - last_closed) // interval_ms)
+        missing = (end_time - last_closed) // interval_ms - 1
+        if missing <= 0:
             return []
 
-        start_time = newest_candle.open_time
-        end_time = int(datetime.now().timestamp() * 1000)
-        return self.fetch_candles_range(start_time, end_time, limit)
+        candles = self.fetch_candles_range(last_closed, end_time, min(limit, missing + 1))
+        return [candle for candle in candles if last_closed < int(candle[0]) < end_time]
 
-    def fetch_candles_range(self, start_time, end_time, limit=100):
+    def fetch_candles_range(self, start_time, end_time, limit=100, raise_errors=False):
         all_candles = []
         current_end = end_time
         while current_end > start_time:
-            candles = self.fetch_candles(current_end, limit)
+            candles = self.fetch_candles(current_end, limit, raise_errors=raise_errors)
             if candles:
                 all_candles.extend(candles)
                 if len(candles) < limit:
@@ -102,6 +151,9 @@ class CandleAgent:
                 current_end = int(candles[0][0])
             else:
                 break
+            deadline = current_deadline()
+            if deadline is not None:
+                deadline.check()
             time.sleep(0.2)
         all_candles.sort(key=lambda x: int(x[0]))
         return all_candles
@@ -109,7 +161,7 @@ class CandleAgent:
     @transaction.atomic
     def save_to_db(self, candles):
         if not candles:
-            print("No data to save.")
+            logger.debug("No data to save.", extra={"symbol": self.symbol, "interval": self.interval.name})
             return 0
 
         try:
@@ -134,23 +186,48 @@ class CandleAgent:
                 if created:
                     saved_count += 1
 
-            print(
-                f"Saved/updated {len(candles)} rows to candles table for {self.symbol} (interval: {self.interval.to_db_format()}ms).")
+            newly_closed = self._advance_sync_state(candles)
+            cache.bump_version(self.symbol, self.interval.to_db_format())
+            if newly_closed:
+                interval_ms = self.interval.to_db_format()
+                transaction.on_commit(
+                    lambda: events.publish_closed_candles(self.symbol, interval_ms, newly_closed))
+
+            logger.info("Saved candles", extra={"symbol": self.symbol, "interval": self.interval.name,
+                                                "rows": len(candles), "created_rows": saved_count})
             return saved_count
 
-        except Exception as e:
-            print(f"Error saving data: {e}")
+        except Exception:
+            logger.exception("Error saving candles", extra={"symbol": self.symbol, "interval": self.interval.name})
             raise
 
+    def _advance_sync_state(self, candles):
+        """Move the series bounds forward and return the candles that closed after the previous last closed one."""
+        open_times = [int(candle[0]) for candle in candles]
+        closed_before = int(datetime.now().timestamp() * 1000) - self.interval.to_db_format()
+        closed_times = [open_time for open_time in open_times if open_time <= closed_before]
+
+        state = self.get_sync_state(for_update=True)
+        previous_closed = state.last_closed_open_time
+        if state.oldest_open_time is not None and min(open_times) < state.oldest_open_time:
+            if state.backfill_status == BackfillStatus.Pending.value:
+                state.backfill_status = BackfillStatus.Running.value
+        state.oldest_open_time = min(filter(None, [state.oldest_open_time, min(open_times)]))
+        state.newest_open_time = max(filter(None, [state.newest_open_time, max(open_times)]))
+        if closed_times:
+            state.last_closed_open_time = max(filter(None, [state.last_closed_open_time, max(closed_times)]))
+        state.save()
+        if previous_closed is None:
+            return []
+        return [candle for candle in candles if previous_closed < int(candle[0]) <= closed_before]
+
     def check_candles_consistency(self):
-        candles = Candle.objects.filter(symbol__symbol=self.symbol, interval=self.interval.value[1])
-        flag = True
-        for previous_candle, candle in zip(candles, candles[1:]):
-            if previous_candle.open_time + self.interval.value[1] != candle.open_time:
-                flag = False
-                print(previous_candle.open_time)
-                break
-        if flag:
+        open_times = Candle.objects.load_arrays(self.symbol, self.interval.to_db_format(),
+                                                fields=('open_time',))['open_time']
+        gaps = np.flatnonzero(np.diff(open_times) != self.interval.to_db_format())
+        if len(gaps):
+            print(open_times[gaps[0]])
+        else:
             print("OKAY")
 
 
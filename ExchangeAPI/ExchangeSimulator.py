@@ -0,0 +1,387 @@
+import bisect
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+from django.test.utils import override_settings
+
+from Database.models import PositionManager, PlanType, PositionDirection, SideFutures
+
+API_PREFIX = "/api/mix/v1/"
+TAKER_FEE = 0.0006
+TIMESTAMP_WINDOW_MS = 30 * 1000
+FILLS_PAGE_SIZE = 100
+DUPLICATE_CLIENT_OID = "40786"
+
+
+class SimulatorError(Exception):
+    def __init__(self, code, message, status=400):
+        self.code = code
+        self.message = message
+        self.status = status
+
+
+class SimulatorConfig:
+    """Latency and failure injection, globally or per endpoint (e.g. "plan/modifyTPSLPlan")."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, error_code="40010", endpoints=None, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.endpoints = endpoints or {}
+        self.random = random.Random(seed)
+
+    def _get(self, endpoint, name):
+        return self.endpoints.get(endpoint, {}).get(name, getattr(self, name))
+
+    def delay(self, endpoint):
+        latency = self._get(endpoint, "latency_ms") + self.random.uniform(0, self._get(endpoint, "jitter_ms"))
+        return latency / 1000
+
+    def injected_error(self, endpoint):
+        if self.random.random() < self._get(endpoint, "error_rate"):
+            return self._get(endpoint, "error_code")
+        return None
+
+
+class MatchingEngine:
+    """Fills market orders at the mark price and fires TP/SL plans when the mark crosses them."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.accounts = {}
+        self.mark_prices = {}
+        self.orders = {}
+        self.plans = {}
+        self.positions = {}
+        self.fills = []
+        # Lookups by (api_key, clientOid) and fill lists per account and symbol and per order, oldest first.
+        self.order_oids = {}
+        self.plan_oids = {}
+        self.account_fills = defaultdict(list)
+        self.order_fill_index = defaultdict(list)
+        self._next_id = 0
+
+    def _new_id(self):
+        self._next_id += 1
+        return str(10 ** 17 + self._next_id)
+
+    def add_account(self, api_key, secret_key, api_passphrase):
+        self.accounts[api_key] = PositionManager(api_key=api_key, secret_key=secret_key,
+                                                 api_passphrase=api_passphrase)
+
+    def set_mark_price(self, symbol, price):
+        with self.lock:
+            self.mark_prices[symbol] = float(price)
+            for plan in list(self.plans.values()):
+                if plan["symbol"] == symbol and plan["status"] == "not_trigger" and self._crossed(plan, price):
+                    self._trigger(plan)
+
+    def _crossed(self, plan, price):
+        above = plan["holdSide"] == PositionDirection.long.value
+        if plan["planType"] == PlanType.sl.value:
+            above = not above
+        return price >= plan["triggerPrice"] if above else price <= plan["triggerPrice"]
+
+    def _trigger(self, plan):
+        key = (plan["api_key"], plan["symbol"], plan["holdSide"])
+        size = self.positions.pop(key, None)
+        for other in self.plans.values():
+            if (other["api_key"], other["symbol"], other["holdSide"]) == key and other["status"] == "not_trigger":
+                other["status"] = "cancel"
+        plan["status"] = "triggered"
+        if size is not None:
+            side = SideFutures.close_long.value if plan["holdSide"] == PositionDirection.long.value \
+                else SideFutures.close_short.value
+            self._fill(plan["api_key"], plan["symbol"], side, size["size"], plan["triggerPrice"], size["price"])
+
+    def _fill(self, api_key, symbol, side, size, price, entry_price=None):
+        order_id = self._new_id()
+        profit = 0.0
+        if entry_price is not None:
+            sign = 1 if side == SideFutures.close_long.value else -1
+            profit = sign * (price - entry_price) * size
+        fill = {
+            "tradeId": self._new_id(),
+            "orderId": order_id,
+            "symbol": symbol,
+            "side": side,
+            "price": str(price),
+            "sizeQty": str(size),
+            "fee": str(-price * size * TAKER_FEE),
+            "fillAmount": str(price * size),
+            "profit": str(profit),
+            "cTime": str(int(time.time() * 1000)),
+        }
+        fill = {**fill, "api_key": api_key}
+        self.fills.append(fill)
+        self.account_fills[(api_key, symbol)].append(fill)
+        self.order_fill_index[order_id].append(fill)
+        self.orders[order_id] = {"orderId": order_id, "symbol": symbol, "side": side, "size": str(size),
+                                 "priceAvg": str(price), "state": "filled", "orderType": "market",
+                                 "api_key": api_key, "cTime": fill["cTime"]}
+        return order_id
+
+    def place_order(self, api_key, body):
+        with self.lock:
+            symbol, side = body["symbol"], body["side"]
+            price = self._mark_price(symbol)
+            size = float(body["size"])
+            direction = SideFutures.get_position_direction(side)
+            client_oid = body.get("clientOid")
+            self._check_client_oid(api_key, client_oid, self.order_oids)
+            if direction is not None:
+                self.positions[(api_key, symbol, direction)] = {"size": size, "price": price}
+                order_id = self._fill(api_key, symbol, side, size, price)
+            else:
+                hold_side = PositionDirection.long.value if side == SideFutures.close_long.value \
+                    else PositionDirection.short.value
+                position = self.positions.pop((api_key, symbol, hold_side), None)
+                if position is None:
+                    raise SimulatorError("40762", "No position to close")
+                order_id = self._fill(api_key, symbol, side, size, price, position["price"])
+            self.orders[order_id]["clientOid"] = client_oid
+            if client_oid:
+                self.order_oids[(api_key, client_oid)] = order_id
+            return {"orderId": order_id, "clientOid": client_oid}
+
+    def place_tpsl(self, api_key, body):
+        with self.lock:
+            self._check_client_oid(api_key, body.get("clientOid"), self.plan_oids)
+            if (api_key, body["symbol"], body["holdSide"]) not in self.positions:
+                raise SimulatorError("43023", "Insufficient position, can not set profit or stop loss")
+            plan_id = self._new_id()
+            self.plans[plan_id] = {"orderId": plan_id, "api_key": api_key, "symbol": body["symbol"],
+                                   "planType": body["planType"], "holdSide": body["holdSide"],
+                                   "triggerPrice": float(body["triggerPrice"]), "status": "not_trigger",
+                                   "clientOid": body.get("clientOid")}
+            if body.get("clientOid"):
+                self.plan_oids[(api_key, body["clientOid"])] = plan_id
+            return {"orderId": plan_id, "clientOid": body.get("clientOid")}
+
+    def _check_client_oid(self, api_key, client_oid, index):
+        if client_oid and (api_key, client_oid) in index:
+            raise SimulatorError(DUPLICATE_CLIENT_OID, "Duplicate clientOid")
+
+    def _active_plan(self, api_key, body):
+        plan = self.plans.get(body["orderId"])
+        if plan is None or plan["api_key"] != api_key or plan["status"] != "not_trigger":
+            raise SimulatorError("43020", "Plan order not exist or has been triggered")
+        return plan
+
+    def modify_plan(self, api_key, body):
+        with self.lock:
+            plan = self._active_plan(api_key, body)
+            plan["triggerPrice"] = float(body["triggerPrice"])
+            return {"orderId": plan["orderId"]}
+
+    def cancel_plan(self, api_key, body):
+        with self.lock:
+            plan = self._active_plan(api_key, body)
+            plan["status"] = "cancel"
+            return {"orderId": plan["orderId"]}
+
+    def mark_price(self, api_key, query):
+        return {"symbol": query["symbol"], "markPrice": str(self._mark_price(query["symbol"])),
+                "timestamp": str(int(time.time() * 1000))}
+
+    def order_fills(self, api_key, query):
+        # Newest first, 100 per page, older pages through lastEndId like the real endpoint.
+        if "orderId" in query:
+            candidates = [fill for fill in self.order_fill_index.get(query["orderId"], ())
+                          if fill["api_key"] == api_key and fill["symbol"] == query["symbol"]]
+        else:
+            candidates = self.account_fills.get((api_key, query["symbol"]), [])
+        # Trade ids and times only grow, so a page is a walk back from lastEndId until startTime.
+        end = len(candidates)
+        if "lastEndId" in query:
+            end = bisect.bisect_left(candidates, int(query["lastEndId"]), key=lambda fill: int(fill["tradeId"]))
+        fills = []
+        for fill in (candidates[index] for index in range(end - 1, -1, -1)):
+            if len(fills) == FILLS_PAGE_SIZE or "startTime" in query and int(fill["cTime"]) < int(query["startTime"]):
+                break
+            if "endTime" not in query or int(fill["cTime"]) <= int(query["endTime"]):
+                fills.append({key: value for key, value in fill.items() if key != "api_key"})
+        return fills
+
+    def order_detail(self, api_key, query):
+        if "clientOid" in query:
+            order = self.orders.get(self.order_oids.get((api_key, query["clientOid"])))
+        else:
+            order = self.orders.get(query.get("orderId")) or self.plans.get(query.get("orderId"))
+        if order is None or order["api_key"] != api_key:
+            raise SimulatorError("40768", "Order does not exist")
+        return {key: value for key, value in order.items() if key != "api_key"}
+
+    def current_plans(self, api_key, query):
+        return [{key: value for key, value in plan.items() if key != "api_key"} for plan in self.plans.values()
+                if plan["api_key"] == api_key and plan["symbol"] == query["symbol"]
+                and plan["status"] == "not_trigger"]
+
+    def _mark_price(self, symbol):
+        if symbol not in self.mark_prices:
+            raise SimulatorError("40034", f"Parameter {symbol} does not exist")
+        return self.mark_prices[symbol]
+
+
+class ExchangeSimulator:
+    """Local stand-in for api.coincatch.com serving the endpoints PositionManager uses."""
+
+    routes = {
+        ("POST", "order/placeOrder"): MatchingEngine.place_order,
+        ("POST", "plan/placeTPSL"): MatchingEngine.place_tpsl,
+        ("POST", "plan/modifyTPSLPlan"): MatchingEngine.modify_plan,
+        ("POST", "plan/cancelPlan"): MatchingEngine.cancel_plan,
+        ("GET", "market/mark-price"): MatchingEngine.mark_price,
+        ("GET", "order/fills"): MatchingEngine.order_fills,
+        ("GET", "order/detail"): MatchingEngine.order_detail,
+        ("GET", "plan/currentPlan"): MatchingEngine.current_plans,
+    }
+
+    def __init__(self, host="127.0.0.1", port=0, config=None, engine=None):
+        self.config = config or SimulatorConfig()
+        self.engine = engine or MatchingEngine()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def authenticate(self, method, path, query_string, body, headers):
+        account = self.engine.accounts.get(headers.get("ACCESS-KEY"))
+        if account is None or headers.get("ACCESS-PASSPHRASE") != account.api_passphrase:
+            raise SimulatorError("40006", "Invalid ACCESS_KEY")
+        timestamp = headers.get("ACCESS-TIMESTAMP", "")
+        if not timestamp.isdigit() or abs(int(time.time() * 1000) - int(timestamp)) > TIMESTAMP_WINDOW_MS:
+            raise SimulatorError("40008", "Request timestamp expired")
+        expected = account.create_signature(timestamp=timestamp, method=method, request_path=path,
+                                            body=body, query_string=query_string or None)
+        if headers.get("ACCESS-SIGN", "").encode() != expected:
+            raise SimulatorError("40009", "sign signature error")
+        return account.api_key
+
+    def handle(self, method, raw_path, body, headers):
+        split = urlsplit(raw_path)
+        endpoint = split.path[len(API_PREFIX):] if split.path.startswith(API_PREFIX) else split.path
+        time.sleep(self.config.delay(endpoint))
+        try:
+            handler = self.routes.get((method, endpoint))
+            if handler is None:
+                raise SimulatorError("40404", "Request URL NOT FOUND", status=404)
+            api_key = self.authenticate(method, split.path, split.query, body, headers)
+            error_code = self.config.injected_error(endpoint)
+            if error_code is not None:
+                raise SimulatorError(error_code, "Injected error")
+            if method == "POST":
+                payload = json.loads(body or "{}")
+            else:
+                payload = {key: values[0] for key, values in parse_qs(split.query).items()}
+            data = handler(self.engine, api_key, payload)
+            return 200, {"code": "00000", "msg": "success", "requestTime": int(time.time() * 1000), "data": data}
+        except SimulatorError as e:
+            return e.status, {"code": e.code, "msg": e.message, "requestTime": int(time.time() * 1000), "data": None}
+
+    def _handler_class(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _respond(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode() if length else ""
+                status, payload = simulator.handle(method, self.path, body, self.headers)
+                encoded = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(encoded)))
+                    self.end_headers()
+                    self.wfile.write(encoded)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up waiting, which is expected when injecting latency.
+                    self.close_connection = True
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def run_load_test(simulator, coin, orders=1000, concurrency=16, quantity=Decimal("10")):
+    """Open and close `orders` round trips through PositionManager and report throughput and latency."""
+    accounts = []
+    for i in range(concurrency):
+        position_manager = PositionManager(api_key=f"load-{i}", secret_key=f"secret-{i}", api_passphrase="pass")
+        simulator.engine.add_account(position_manager.api_key, position_manager.secret_key,
+                                     position_manager.api_passphrase)
+        accounts.append(position_manager)
+
+    def worker(position_manager, round_trips):
+        latencies = []
+        for _ in range(round_trips):
+            for side in (SideFutures.open_long.value, SideFutures.close_long.value):
+                started = time.perf_counter()
+                position_manager.futures_trade(coin=coin, quantity=quantity, side=side)
+                latencies.append(time.perf_counter() - started)
+        return latencies
+
+    # Each worker owns one account so its open/close pairs never interleave with another worker's.
+    shares = [orders // concurrency + (1 if i < orders % concurrency else 0) for i in range(concurrency)]
+    with override_settings(COINCATCH_BASE_URL=simulator.base_url):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = executor.map(worker, accounts, shares)
+            latencies = np.array([latency for result in results for latency in result])
+        elapsed = time.perf_counter() - started
+
+    p50, p95, p99 = (float(value) for value in np.percentile(latencies, [50, 95, 99]) * 1000)
+    return {
+        "orders": len(latencies),
+        "seconds": elapsed,
+        "orders_per_second": len(latencies) / elapsed,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "max_ms": float(latencies.max()) * 1000,
+    }
+
+
+def main():
+    config = SimulatorConfig(latency_ms=5, jitter_ms=20)
+    with ExchangeSimulator(config=config) as simulator:
+        simulator.engine.set_mark_price("DOGEUSDT_UMCBL", 0.2)
+        print(run_load_test(simulator, coin="DOGEUSDT_UMCBL"))
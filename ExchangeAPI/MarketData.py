@@ -0,0 +1,232 @@
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextvars import copy_context
+
+import numpy as np
+import requests
+from django.conf import settings
+
+from Database.models import Candle
+from Database.resilience import current_deadline, request_timeout
+
+# Instruments a candle series can be quoted on. Venues are only interchangeable for the same one.
+SPOT = "spot"
+USDT_FUTURES = "usdt-futures"
+
+GRANULARITIES = {
+    "MIN_1": "1m", "MIN_3": "3m", "MIN_5": "5m", "MIN_15": "15m", "MIN_30": "30m",
+    "HOUR_1": "1H", "HOUR_4": "4H", "DAY_1": "1D",
+}
+
+
+class MarketDataProvider(ABC):
+    """One venue. Candles come back as Bitget-style rows, oldest first:
+    [open_time, open, high, low, close, base_volume, usdt_volume, quote_volume] as strings, up to and including
+    the candle opening at end_time. Mark prices are always those of the USDT-margined perpetual."""
+
+    name = None
+    markets = ()
+
+    @abstractmethod
+    def fetch_candles(self, symbol, interval, end_time, limit=100, market=SPOT):
+        raise NotImplementedError
+
+    @abstractmethod
+    def fetch_mark_price(self, symbol):
+        raise NotImplementedError
+
+
+class BitgetProvider(MarketDataProvider):
+    name = "bitget"
+    markets = (SPOT, USDT_FUTURES)
+    candles_url = "https://api.bitget.com/api/v2/spot/market/history-candles"
+    futures_candles_url = "https://api.bitget.com/api/v2/mix/market/history-candles"
+    mark_price_url = "https://api.bitget.com/api/v2/mix/market/symbol-price"
+
+    def fetch_candles(self, symbol, interval, end_time, limit=100, market=SPOT):
+        if market == SPOT:
+            query_string = f"?symbol={symbol}&granularity={interval.api_format()}&endTime={end_time}&limit={limit}"
+            data = _get_json(self.candles_url + query_string)
+        else:
+            query_string = (f"?symbol={symbol}&productType={USDT_FUTURES}&granularity={GRANULARITIES[interval.name]}"
+                            f"&endTime={end_time}&limit={limit}")
+            # Futures rows stop at the quote volume, which is the USDT volume for USDT-margined contracts.
+            data = [row[:6] + [row[6], row[6]] for row in _get_json(self.futures_candles_url + query_string)]
+        return sorted(data, key=lambda row: int(row[0]))
+
+    def fetch_mark_price(self, symbol):
+        data = _get_json(f"{self.mark_price_url}?productType=usdt-futures&symbol={symbol}")
+        return data[0]["markPrice"]
+
+
+class CoinCatchProvider(MarketDataProvider):
+    name = "coincatch"
+    markets = (USDT_FUTURES,)
+
+    def fetch_candles(self, symbol, interval, end_time, limit=100, market=USDT_FUTURES):
+        start_time = end_time - limit * interval.to_db_format()
+        query_string = (f"?symbol={symbol}_UMCBL&granularity={GRANULARITIES[interval.name]}"
+                        f"&startTime={start_time}&endTime={end_time}&limit={limit}")
+        data = _get_json(settings.COINCATCH_BASE_URL + "/api/mix/v1/market/candles" + query_string)
+        # CoinCatch rows stop at the quote volume, which is the USDT volume for USDT-margined contracts.
+        rows = [[str(value) for value in row[:6]] + [str(row[6]), str(row[6])] for row in data]
+        return sorted(rows, key=lambda row: int(row[0]))
+
+    def fetch_mark_price(self, symbol):
+        data = _get_json(settings.COINCATCH_BASE_URL + f"/api/mix/v1/market/mark-price?symbol={symbol}_UMCBL")
+        return data["markPrice"]
+
+
+class LocalVenueProvider(MarketDataProvider):
+    """Serves stored candles with a configurable latency profile, to exercise routing without the network."""
+
+    def __init__(self, name="local", latency_ms=0, jitter_ms=0, error_rate=0.0, seed=None,
+                 markets=(SPOT, USDT_FUTURES)):
+        self.name = name
+        self.markets = tuple(markets)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+    def _simulate(self):
+        time.sleep((self.latency_ms + self.random.expovariate(1 / self.jitter_ms) if self.jitter_ms
+                    else self.latency_ms) / 1000)
+        if self.random.random() < self.error_rate:
+            raise requests.ConnectionError(f"{self.name} unavailable")
+
+    def fetch_candles(self, symbol, interval, end_time, limit=100, market=SPOT):
+        self._simulate()
+        rows = Candle.objects.filter(
+            symbol__symbol=symbol,
+            interval=interval.to_db_format(),
+            open_time__lte=end_time
+        ).order_by('-open_time').values_list(
+            'open_time', 'open', 'high', 'low', 'close', 'base_volume', 'usdt_volume', 'quote_volume'
+        )[:limit]
+        return [[str(value) for value in row] for row in reversed(rows)]
+
+    def fetch_mark_price(self, symbol):
+        self._simulate()
+        candle = Candle.objects.filter(symbol__symbol=symbol).order_by('-open_time').first()
+        return str(candle.close)
+
+
+def _get_json(url):
+    response = requests.get(url, timeout=request_timeout())
+    response.raise_for_status()
+    data = response.json()
+    if data.get("code") != "00000":
+        raise ValueError(data.get('msg', 'Unknown error'))
+    return data["data"]
+
+
+class VenueStats:
+    def __init__(self, window=100):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self.lock:
+            if ok:
+                self.latencies.append(latency)
+            self.outcomes.append(ok)
+
+    def latency_percentile(self, percentile):
+        with self.lock:
+            return float(np.percentile(self.latencies, percentile)) if self.latencies else 0.0
+
+    def error_rate(self):
+        with self.lock:
+            return 1 - sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class MarketDataRouter:
+    """Routes each call to the fastest healthy venue and optionally hedges slow calls on the runner-up."""
+
+    def __init__(self, providers, hedge_percentile=None, max_error_rate=0.5, window=100):
+        self.providers = list(providers)
+        self.hedge_percentile = hedge_percentile
+        self.max_error_rate = max_error_rate
+        self.stats = {provider.name: VenueStats(window) for provider in self.providers}
+        self.executor = ThreadPoolExecutor(max_workers=2 * len(self.providers))
+
+    def ranked(self):
+        def key(provider):
+            stats = self.stats[provider.name]
+            return stats.error_rate() > self.max_error_rate, stats.latency_percentile(50)
+        return sorted(self.providers, key=key)
+
+    def _call(self, provider, method, *args):
+        started = time.perf_counter()
+        try:
+            result = getattr(provider, method)(*args)
+        except Exception:
+            self.stats[provider.name].record(time.perf_counter() - started, False)
+            raise
+        self.stats[provider.name].record(time.perf_counter() - started, True)
+        return result
+
+    def _submit(self, provider, method, *args):
+        # Run in a copy of the caller's context so the active deadline reaches the worker thread.
+        return self.executor.submit(copy_context().run, self._call, provider, method, *args)
+
+    def _route(self, method, *args, market=None):
+        providers = [provider for provider in self.ranked() if market is None or market in provider.markets]
+        errors = []
+        deadline = current_deadline()
+        while providers:
+            primary = providers.pop(0)
+            pending = {self._submit(primary, method, *args)}
+            hedge_after = None
+            if self.hedge_percentile is not None and providers:
+                hedge_after = self.stats[primary.name].latency_percentile(self.hedge_percentile) or None
+            while pending:
+                timeout = hedge_after
+                if deadline is not None:
+                    timeout = deadline.timeout(hedge_after)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        return future.result()
+                    except Exception as e:
+                        errors.append(e)
+                if not done and hedge_after is not None and providers:
+                    # Primary is slower than its usual percentile: race the next venue against it.
+                    pending.add(self._submit(providers.pop(0), method, *args))
+                hedge_after = None
+        raise requests.RequestException(f"All market data venues failed: {errors}")
+
+    def fetch_candles(self, symbol, interval, end_time, limit=100, market=None):
+        """Candles of one instrument: only venues quoting `market` (MARKET_DATA_CANDLE_MARKET by default) are
+        tried, so a failover never splices another instrument's prices into the series."""
+        market = market or settings.MARKET_DATA_CANDLE_MARKET
+        return self._route("fetch_candles", symbol, interval, end_time, limit, market, market=market)
+
+    def fetch_mark_price(self, symbol):
+        return self._route("fetch_mark_price", symbol)
+
+
+VENUES = {
+    "bitget": BitgetProvider,
+    "coincatch": CoinCatchProvider,
+}
+
+_default_router = None
+_default_router_lock = threading.Lock()
+
+
+def get_router():
+    global _default_router
+    with _default_router_lock:
+        if _default_router is None:
+            _default_router = MarketDataRouter(
+                [VENUES[name]() for name in settings.MARKET_DATA_VENUES],
+                hedge_percentile=settings.MARKET_DATA_HEDGE_PERCENTILE,
+            )
+        return _default_router
@@ -0,0 +1,290 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from Database import cache
+from Database.models import Candle, CandleSyncState, CANDLE_FIELDS, Symbol
+from ExchangeAPI.MarketData import SPOT, USDT_FUTURES
+
+# Fixed-width little-endian records; a segment file is nothing but these records back to back.
+TICK_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('price', '<f8'),
+    ('size', '<f8'),
+    ('side', 'i1'),
+])
+INDEX_DTYPE = np.dtype([('time', '<i8'), ('record', '<i8')])
+
+TRADE = "trade"
+MARK = "mark"
+BUY = 1
+SELL = -1
+
+# Bitget websocket instType of each market.
+INST_TYPES = {SPOT: "SPOT", USDT_FUTURES: "USDT-FUTURES"}
+MARKET_FILE = "market"
+
+logger = logging.getLogger(__name__)
+
+
+def _series_dir(root, symbol, kind):
+    return Path(root) / symbol / kind
+
+
+def captured_market(root, symbol):
+    """The market a symbol's ticks were captured on; captures predating the marker file were futures."""
+    path = Path(root) / symbol / MARKET_FILE
+    return path.read_text().strip() if path.exists() else USDT_FUTURES
+
+
+class TickWriter:
+    """Appends ticks of one symbol and kind to hourly (by default) segment files.
+
+    Ticks are buffered in memory and written in blocks; every `index_every` records the segment's
+    sparse `.idx` file gets a (time, record) entry so readers can seek without scanning.
+    """
+
+    def __init__(self, root, symbol, kind=TRADE, segment_ms=None, buffer_size=8192, index_every=1024):
+        self.directory = _series_dir(root, symbol, kind)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_ms = segment_ms or settings.TICK_SEGMENT_MS
+        self.index_every = index_every
+        self.buffer = np.empty(buffer_size, dtype=TICK_DTYPE)
+        self.pending = 0
+        self.segment_start = None
+        self.records = 0
+        self.last_time = None
+        self.lock = threading.Lock()
+
+    def append(self, time_ms, price, size=0.0, side=0):
+        with self.lock:
+            # Segments and the index rely on time order, so a late tick is stamped with the last time seen.
+            if self.last_time is not None and time_ms < self.last_time:
+                time_ms = self.last_time
+            if self.segment_start is None or time_ms >= self.segment_start + self.segment_ms:
+                self._flush()
+                self._open_segment(time_ms)
+            self.buffer[self.pending] = (time_ms, price, size, side)
+            self.pending += 1
+            self.last_time = time_ms
+            if self.pending == len(self.buffer):
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _open_segment(self, time_ms):
+        self.segment_start = time_ms - time_ms % self.segment_ms
+        path = self.directory / f"{self.segment_start}.ticks"
+        self.records = os.path.getsize(path) // TICK_DTYPE.itemsize if path.exists() else 0
+
+    def _flush(self):
+        if not self.pending:
+            return
+        block = self.buffer[:self.pending]
+        first = -self.records % self.index_every
+        index = np.empty(len(range(first, self.pending, self.index_every)), dtype=INDEX_DTYPE)
+        index['record'] = np.arange(first, self.pending, self.index_every) + self.records
+        index['time'] = block['time'][first::self.index_every]
+
+        with open(self.directory / f"{self.segment_start}.ticks", "ab") as segment:
+            segment.write(block.tobytes())
+        if len(index):
+            with open(self.directory / f"{self.segment_start}.idx", "ab") as index_file:
+                index_file.write(index.tobytes())
+        self.records += self.pending
+        self.pending = 0
+
+
+class TickReader:
+    """Reads segments through read-only memory maps, so concurrent readers share the page cache."""
+
+    def __init__(self, root, symbol, kind=TRADE):
+        self.directory = _series_dir(root, symbol, kind)
+
+    def segments(self):
+        if not self.directory.exists():
+            return []
+        return sorted(int(path.stem) for path in self.directory.glob("*.ticks"))
+
+    def _map(self, segment_start):
+        path = self.directory / f"{segment_start}.ticks"
+        # A writer may be mid-record; only whole records are mapped.
+        count = os.path.getsize(path) // TICK_DTYPE.itemsize
+        if not count:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return np.memmap(path, dtype=TICK_DTYPE, mode='r', shape=(count,))
+
+    def _seek(self, ticks, segment_start, time_ms):
+        """First record at or after `time_ms`, narrowed with the sparse index before the binary search."""
+        low, high = 0, len(ticks)
+        index_path = self.directory / f"{segment_start}.idx"
+        if index_path.exists():
+            index = np.fromfile(index_path, dtype=INDEX_DTYPE)
+            position = int(np.searchsorted(index['time'], time_ms, side='left'))
+            if position > 0:
+                low = int(index['record'][position - 1])
+            if position < len(index):
+                high = min(high, int(index['record'][position]) + 1)
+        return low + int(np.searchsorted(ticks['time'][low:high], time_ms, side='left'))
+
+    def iter_range(self, start_time, end_time):
+        """Yield views of [start_time, end_time) one segment at a time."""
+        for segment_start in self.segments():
+            if segment_start >= end_time:
+                break
+            ticks = self._map(segment_start)
+            if not len(ticks) or ticks['time'][-1] < start_time:
+                continue
+            first = self._seek(ticks, segment_start, start_time)
+            last = self._seek(ticks, segment_start, end_time)
+            if last > first:
+                yield ticks[first:last]
+
+    def read(self, start_time, end_time):
+        chunks = [np.array(chunk) for chunk in self.iter_range(start_time, end_time)]
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=TICK_DTYPE)
+
+
+def compact(root, symbol, interval_ms, start_time, end_time):
+    """Roll trades in [start_time, end_time) into Candle rows of `interval_ms`; stored REST candles win.
+
+    Only buckets that are fully inside the range are written, so a partial first or last bucket is skipped, and
+    only when the ticks were captured on MARKET_DATA_CANDLE_MARKET, so the series never mixes instruments.
+    The REST agent's update_or_create later overwrites these rows: the series' stored bounds are widened here,
+    but its last closed cursor is left for the REST feed, which therefore still fetches those buckets.
+    """
+    market = captured_market(root, symbol)
+    if market != settings.MARKET_DATA_CANDLE_MARKET:
+        logger.warning("Ticks not compacted: captured on another market than the candle series",
+                       extra={"symbol": symbol, "captured_market": market,
+                              "candle_market": settings.MARKET_DATA_CANDLE_MARKET})
+        return 0
+    start_time += -start_time % interval_ms
+    end_time -= end_time % interval_ms
+    if end_time <= start_time:
+        return 0
+    ticks = TickReader(root, symbol, TRADE).read(start_time, end_time)
+    if not len(ticks):
+        return 0
+
+    buckets = ticks['time'] - ticks['time'] % interval_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ticks)] - 1
+    notional = ticks['price'] * ticks['size']
+    rows = np.column_stack([
+        buckets[starts],
+        ticks['price'][starts],
+        np.maximum.reduceat(ticks['price'], starts),
+        np.minimum.reduceat(ticks['price'], starts),
+        ticks['price'][ends],
+        np.add.reduceat(ticks['size'], starts),
+        np.add.reduceat(notional, starts),
+        np.add.reduceat(notional, starts),
+    ])
+    Symbol.objects.get_or_create(symbol=symbol)
+    created = Candle.objects.bulk_create([
+        Candle(symbol_id=symbol, interval=interval_ms, **dict(zip(CANDLE_FIELDS, row)))
+        for row in rows.tolist()
+    ], ignore_conflicts=True)
+    first, last = int(rows[0, 0]), int(rows[-1, 0])
+    CandleSyncState.objects.filter(symbol_id=symbol, interval=interval_ms).update(
+        oldest_open_time=Least(Coalesce('oldest_open_time', first), first),
+        newest_open_time=Greatest(Coalesce('newest_open_time', last), last),
+    )
+    cache.bump_version(symbol, interval_ms)
+    return len(created)
+
+
+class TickCapture:
+    """Records Bitget public trades (and, on futures, mark prices) for `symbols` into a TickStore root.
+
+    The market captured is written next to each symbol's ticks, so compaction can tell which series they fit.
+    """
+
+    url = "wss://ws.bitget.com/v2/ws/public"
+    ping_seconds = 25
+
+    def __init__(self, root, symbols, market=None):
+        self.root = root
+        self.symbols = list(symbols)
+        self.market = market or settings.TICK_CAPTURE_MARKET
+        self.inst_type = INST_TYPES[self.market]
+        self.writers = {}
+        self.received = 0
+
+    def _writer(self, symbol, kind):
+        if (symbol, kind) not in self.writers:
+            self.writers[(symbol, kind)] = TickWriter(self.root, symbol, kind)
+            (Path(self.root) / symbol / MARKET_FILE).write_text(self.market)
+        return self.writers[(symbol, kind)]
+
+    def subscription(self):
+        # Spot has no mark price, so its ticker channel is not recorded.
+        channels = ("trade", "ticker") if self.market == USDT_FUTURES else ("trade",)
+        args = [{"instType": self.inst_type, "channel": channel, "instId": symbol}
+                for symbol in self.symbols for channel in channels]
+        return json.dumps({"op": "subscribe", "args": args})
+
+    def handle_message(self, message):
+        if message == "pong":
+            return
+        payload = json.loads(message)
+        channel = payload.get("arg", {}).get("channel")
+        symbol = payload.get("arg", {}).get("instId")
+        if channel == "trade":
+            writer = self._writer(symbol, TRADE)
+            for trade in payload.get("data", []):
+                writer.append(int(trade["ts"]), float(trade["price"]), float(trade["size"]),
+                              BUY if trade["side"] == "buy" else SELL)
+                self.received += 1
+        elif channel == "ticker":
+            writer = self._writer(symbol, MARK)
+            for ticker in payload.get("data", []):
+                writer.append(int(ticker["ts"]), float(ticker["markPrice"]))
+                self.received += 1
+
+    def flush(self):
+        for writer in self.writers.values():
+            writer.flush()
+
+    def run(self, flush_seconds=None):
+        flush_seconds = flush_seconds or settings.TICK_FLUSH_SECONDS
+        import websocket
+
+        connection = websocket.create_connection(self.url, timeout=self.ping_seconds)
+        connection.send(self.subscription())
+        last_ping = last_flush = time.monotonic()
+        try:
+            while True:
+                try:
+                    self.handle_message(connection.recv())
+                except websocket.WebSocketTimeoutException:
+                    pass
+                now = time.monotonic()
+                if now - last_ping >= self.ping_seconds:
+                    connection.send("ping")
+                    last_ping = now
+                if now - last_flush >= flush_seconds:
+                    self.flush()
+                    last_flush = now
+        finally:
+            self.flush()
+            connection.close()
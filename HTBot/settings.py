@@ -135,3 +135,171 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'  # Matches Django's TIME_ZONE
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+
+# Exchange
+COINCATCH_BASE_URL = os.getenv('COINCATCH_BASE_URL', 'https://api.coincatch.com')
+
+# Market data venues in order of preference; the router re-ranks them by observed latency and errors.
+MARKET_DATA_VENUES = ['bitget', 'coincatch']
+MARKET_DATA_HEDGE_PERCENTILE = 95
+# Instrument the stored candles are quoted on: 'spot' (Bitget only, the original series) or 'usdt-futures'
+# (the contract traded, served by Bitget and CoinCatch). Changing it on a populated database mixes instruments.
+MARKET_DATA_CANDLE_MARKET = os.getenv('MARKET_DATA_CANDLE_MARKET', 'spot')
+
+# Resilience
+EXCHANGE_REQUEST_TIMEOUT = 10  # seconds, upper bound for any single exchange call
+TICK_DEADLINE_SECONDS = 45
+# Budget of every other task; one already running under a deadline keeps its caller's.
+TASK_DEADLINE_SECONDS = {
+    'check_candles_and_open': TICK_DEADLINE_SECONDS,
+    'check_position': TICK_DEADLINE_SECONDS,
+    'arm_candle_schedules': 60,
+    'start_backfill': 60,
+    'backfill_all_symbols': 60,
+    'backfill_chunk': 15 * 60,
+    'finish_backfill': 60,
+    'enforce_candle_retention': 2 * 60 * 60,
+    'compact_ticks': 5 * 60,
+    'run_paper_trading': 50,  # below its 60 s beat period, so ticks never overlap
+    'update_universe_rankings': 30 * 60,
+    'revalidate_backtests': 60 * 60,
+    'sync_fill_ledger': 5 * 60,
+}
+CIRCUIT_BREAKER_FAILURES = 5
+CIRCUIT_BREAKER_RESET_SECONDS = 30
+# An open attempt still Pending after this long is resumed or rolled back by resume_pending_opens.
+PENDING_OPEN_TIMEOUT_MS = 2 * 60 * 1000
+REDIS_URL = os.getenv('REDIS_URL', CELERY_BROKER_URL)
+
+# Queues: run dedicated workers per queue so backfill can never delay an order, e.g.
+#   celery -A HTBot worker -Q orders -c 2
+#   celery -A HTBot worker -Q monitoring,ingestion
+#   celery -A HTBot worker -Q backfill
+# On Redis a lower priority number is served first within a queue.
+CELERY_TASK_ROUTES = {
+    'Database.tasks.my_task': {'queue': 'orders', 'priority': 0},
+    'Database.tasks.check_candles_and_open': {'queue': 'orders', 'priority': 0},
+    'Database.tasks.evaluate_closed_candle': {'queue': 'orders', 'priority': 0},
+    'Database.tasks.check_position': {'queue': 'monitoring', 'priority': 3},
+    'Database.tasks.resume_pending_opens': {'queue': 'orders', 'priority': 3},
+    'Database.tasks.arm_candle_schedules': {'queue': 'monitoring', 'priority': 3},
+    'Database.tasks.sync_fill_ledger': {'queue': 'monitoring', 'priority': 6},
+    'Database.tasks.run_paper_trading': {'queue': 'monitoring', 'priority': 6},
+    'Database.tasks.start_backfill': {'queue': 'backfill', 'priority': 9},
+    'Database.tasks.backfill_all_symbols': {'queue': 'backfill', 'priority': 9},
+    'Database.tasks.backfill_chunk': {'queue': 'backfill', 'priority': 9},
+    'Database.tasks.finish_backfill': {'queue': 'backfill', 'priority': 9},
+    'Database.tasks.enforce_candle_retention': {'queue': 'backfill', 'priority': 9},
+    'Database.tasks.update_universe_rankings': {'queue': 'backfill', 'priority': 9},
+    'Database.tasks.revalidate_backtests': {'queue': 'backfill', 'priority': 9},
+}
+CELERY_TASK_DEFAULT_QUEUE = 'ingestion'
+CELERY_TASK_DEFAULT_PRIORITY = 6
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Candle-close scheduling: strategy series go to the order queue, plain ingestion to its own.
+CANDLE_SCHEDULE_GRACE_MS = 60 * 1000
+CANDLE_SCHEDULE_QUEUES = {
+    True: {'queue': 'orders', 'priority': 0},
+    False: {'queue': 'ingestion', 'priority': 6},
+}
+CELERY_BEAT_SCHEDULE = {
+    'arm-candle-schedules': {
+        'task': 'Database.tasks.arm_candle_schedules',
+        'schedule': 60.0,
+    },
+    'resume-pending-opens': {
+        'task': 'Database.tasks.resume_pending_opens',
+        'schedule': 60.0,
+    },
+    'run-paper-trading': {
+        'task': 'Database.tasks.run_paper_trading',
+        'schedule': 60.0,
+    },
+    'sync-fill-ledger': {
+        'task': 'Database.tasks.sync_fill_ledger',
+        'schedule': 5 * 60.0,
+    },
+    'compact-ticks': {
+        'task': 'Database.tasks.compact_ticks',
+        'schedule': 5 * 60.0,
+    },
+    'enforce-candle-retention': {
+        'task': 'Database.tasks.enforce_candle_retention',
+        'schedule': 6 * 60 * 60.0,
+    },
+    'update-universe-rankings': {
+        'task': 'Database.tasks.update_universe_rankings',
+        'schedule': 24 * 60 * 60.0,
+    },
+    'revalidate-backtests': {
+        'task': 'Database.tasks.revalidate_backtests',
+        'schedule': 24 * 60 * 60.0,
+    },
+}
+
+# Candle retention: fine intervals older than keep_days are rolled into `rollup_to` and then deleted
+# in throttled batches (archived to CANDLE_ARCHIVE_DIR first when it is set). Unlisted intervals are kept forever.
+CANDLE_RETENTION = {
+    'MIN_1': {'keep_days': 30, 'rollup_to': 'MIN_15'},
+    'MIN_3': {'keep_days': 60, 'rollup_to': 'MIN_15'},
+    'MIN_5': {'keep_days': 60, 'rollup_to': 'MIN_15'},
+    'MIN_15': {'keep_days': 730, 'rollup_to': 'HOUR_1'},
+    'MIN_30': {'keep_days': 730, 'rollup_to': 'HOUR_1'},
+}
+CANDLE_RETENTION_BATCH_SIZE = 5000
+CANDLE_RETENTION_PAUSE_SECONDS = 0.2
+CANDLE_ARCHIVE_DIR = os.getenv('CANDLE_ARCHIVE_DIR')
+
+# Tick capture: append-only segment files per symbol, one per TICK_SEGMENT_MS of ticks.
+TICK_STORE_DIR = os.getenv('TICK_STORE_DIR', str(BASE_DIR / 'ticks'))
+TICK_SEGMENT_MS = 60 * 60 * 1000
+# Market captured; compact_ticks only writes candles when it is MARKET_DATA_CANDLE_MARKET.
+TICK_CAPTURE_MARKET = os.getenv('TICK_CAPTURE_MARKET', 'usdt-futures')
+# Ticks sit in the capture process's buffer for up to TICK_FLUSH_SECONDS, so compaction stays
+# TICK_COMPACT_LAG_MS behind the clock and never rolls up a bucket whose trades are still in memory.
+TICK_FLUSH_SECONDS = 1.0
+TICK_COMPACT_LAG_MS = int(TICK_FLUSH_SECONDS * 1000) + 10 * 1000
+
+# Candle events: every newly closed candle is XADDed to the Redis stream candles:<symbol>:<interval ms>.
+CANDLE_EVENTS_ENABLED = True
+CANDLE_EVENT_MAXLEN = 10000
+
+# Versioned result cache in Redis: entries are evicted least recently used first past CACHE_MAX_BYTES.
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+CACHE_LOCK_MS = 30000
+
+# Universe screening: symbols are ranked daily over a trailing window of returns; those with less than
+# UNIVERSE_MIN_COVERAGE of the window's candles are left unranked.
+UNIVERSE_INTERVAL = 'HOUR_1'
+UNIVERSE_WINDOW_DAYS = 30
+UNIVERSE_MIN_COVERAGE = 0.9
+UNIVERSE_SCORE_WEIGHTS = {'liquidity': 0.5, 'volatility': 0.25, 'diversification': 0.25}
+
+# Nightly backtest re-validation runs from a fixed start so each night only recomputes the new tail.
+BACKTEST_REVALIDATION_START_TIME = int(os.getenv('BACKTEST_REVALIDATION_START_TIME', 1704067200000))
+
+# Structured logging: JSON lines written by a background thread, secrets redacted, large DEBUG payloads sampled.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'correlation': {'()': 'Database.log.CorrelationFilter'},
+        'sampling': {'()': 'Database.log.SamplingFilter', 'every': 100, 'min_bytes': 2048},
+    },
+    'handlers': {
+        'json': {
+            'class': 'Database.log.BackgroundJSONHandler',
+            'filters': ['sampling', 'correlation'],
+        },
+    },
+    'loggers': {
+        name: {'handlers': ['json'], 'level': os.getenv('LOG_LEVEL', 'INFO'), 'propagate': False}
+        for name in ('Database', 'ExchangeAPI', 'Strategies')
+    },
+}
@@ -0,0 +1,164 @@
+import numpy as np
+
+from Database import cache
+from Database.models import Candle
+from ExchangeAPI.APICallManager import Interval
+
+TRADE_DTYPE = np.dtype([
+    ('signal_time', np.int64),
+    ('exit_time', np.int64),
+    ('direction', np.int8),
+    ('entry_price', np.float64),
+    ('success', np.bool_),
+    ('resolved', np.bool_),
+])
+
+LONG = 1
+SHORT = -1
+
+CANDLE_FIELDS = ('open_time', 'open', 'high', 'low', 'close')
+DRILL_DOWN_INTERVALS = (Interval.MIN_15.to_db_format(), Interval.MIN_1.to_db_format())
+
+
+def load_candles(symbol, interval, start_time=None, end_time=None):
+    return cache.load_arrays(symbol, interval, start_time, end_time, fields=CANDLE_FIELDS)
+
+
+def streak_signals(candles, streak_length=3):
+    """+1/-1 where the candle closes a run of `streak_length` green/red candles, else 0."""
+    green = (candles['open'] - candles['close'] <= 0).astype(np.int64)
+    window = np.ones(streak_length, dtype=np.int64)
+    green_runs = np.convolve(green, window, mode='full')[:len(green)]
+    signals = np.zeros(len(green), dtype=np.int8)
+    signals[streak_length - 1:][green_runs[streak_length - 1:] == streak_length] = LONG
+    signals[streak_length - 1:][green_runs[streak_length - 1:] == 0] = SHORT
+    return signals
+
+
+def _first_hit(candles, start, direction, tp_price, sl_price):
+    """Index of the first candle from `start` touching TP or SL, and whether TP was touched there."""
+    size = 64
+    while start < len(candles):
+        window = candles[start:start + size]
+        if direction == LONG:
+            tp_hit, sl_hit = window['high'] >= tp_price, window['low'] <= sl_price
+        else:
+            tp_hit, sl_hit = window['low'] <= tp_price, window['high'] >= sl_price
+        hit = tp_hit | sl_hit
+        if hit.any():
+            offset = int(hit.argmax())
+            return start + offset, bool(tp_hit[offset]), bool(sl_hit[offset])
+        start += size
+        size *= 4
+    return None, False, False
+
+
+class IntraCandleResolver:
+    """Settles candles that touch both TP and SL by walking the stored lower intervals inside them.
+
+    Only the ambiguous candles are looked up, one indexed query per lower interval for all of them. Where an
+    interval has a gap the rest of the window moves on to the next one; a candle still ambiguous at the lowest
+    interval, or with no data there either, counts as a stop.
+    """
+
+    def __init__(self, symbol, interval, lower_intervals=DRILL_DOWN_INTERVALS, batch_size=1000):
+        self.symbol = symbol
+        self.interval = interval
+        self.lower_intervals = sorted((lower for lower in lower_intervals
+                                       if lower < interval and interval % lower == 0), reverse=True)
+        self.batch_size = batch_size
+
+    def _load(self, interval, open_times):
+        rows = {}
+        for start in range(0, len(open_times), self.batch_size):
+            queryset = Candle.objects.series([self.symbol], interval).filter(
+                open_time__in=open_times[start:start + self.batch_size])
+            for open_time, high, low in Candle.objects.to_array(queryset, ('open_time', 'high', 'low')).tolist():
+                rows[open_time] = high, low
+        return rows
+
+    def resolve(self, bars):
+        """TP-first outcome of each (open_time, direction, tp_price, sl_price) bar."""
+        outcomes = [False] * len(bars)
+        pending = {index: (bar[0], self.interval) for index, bar in enumerate(bars)}
+        for lower in self.lower_intervals:
+            if not pending:
+                break
+            rows = self._load(lower, sorted({start + step * lower for start, length in pending.values()
+                                             for step in range(length // lower)}))
+            still_pending = {}
+            for index, (start, length) in pending.items():
+                _, direction, tp_price, sl_price = bars[index]
+                for step in range(length // lower):
+                    open_time = start + step * lower
+                    if open_time not in rows:
+                        still_pending[index] = (open_time, start + length - open_time)
+                        break
+                    high, low = rows[open_time]
+                    if direction == LONG:
+                        tp_hit, sl_hit = high >= tp_price, low <= sl_price
+                    else:
+                        tp_hit, sl_hit = low <= tp_price, high >= sl_price
+                    if tp_hit and sl_hit:
+                        still_pending[index] = (open_time, lower)
+                        break
+                    if tp_hit or sl_hit:
+                        outcomes[index] = tp_hit
+                        break
+            pending = still_pending
+        return outcomes
+
+
+def backtest(candles, tp_percentage, sl_percentage, streak_length=3, after=None, resolver=None,
+             live_cursor=False):
+    """Vectorized port of the notebook streak strategy: one position at a time, TP/SL off the signal close.
+
+    Signals at or before `after` (default: the first candle) are skipped, so a run can resume from the exit of
+    an earlier trade given the `streak_length - 1` candles before it. The notebook lets a streak reach back past
+    the last exit; with `live_cursor` every candle of it must open after the exit instead, as production's
+    timestamp_cursor requires. Candles touching both TP and SL go to `resolver` when one is given; the exit
+    candle is the same either way, so they are settled in one batch.
+    """
+    signals = streak_signals(candles, streak_length)
+    trades = []
+    ambiguous = []
+    if after is not None:
+        last_time = after
+    else:
+        last_time = candles['open_time'][0] if len(candles) else 0
+    first_offset = streak_length - 1 if live_cursor else 0
+    for index in np.flatnonzero(signals):
+        if candles['open_time'][index - first_offset] <= last_time:
+            continue
+        direction = int(signals[index])
+        price = candles['close'][index]
+        tp_price = price * (1 + direction * tp_percentage / 100)
+        sl_price = price * (1 - direction * sl_percentage / 100)
+        exit_index, tp_hit, sl_hit = _first_hit(candles, index + 1, direction, tp_price, sl_price)
+        if exit_index is None:
+            trades.append((candles['open_time'][index], -1, direction, price, False, False))
+            break
+        # Without a resolver same-candle ambiguity is settled as in the notebook: TP wins for longs, SL for shorts.
+        success = tp_hit if direction == LONG else tp_hit and not sl_hit
+        if resolver is not None and tp_hit and sl_hit:
+            ambiguous.append((len(trades), int(candles['open_time'][exit_index]), direction, tp_price, sl_price))
+        trades.append((candles['open_time'][index], candles['open_time'][exit_index], direction, price,
+                       success, True))
+        last_time = candles['open_time'][exit_index]
+    trades = np.array(trades, dtype=TRADE_DTYPE)
+    if ambiguous:
+        trades['success'][[bar[0] for bar in ambiguous]] = resolver.resolve([bar[1:] for bar in ambiguous])
+    return trades
+
+
+def pnl_percentages(trades, tp_percentage, sl_percentage):
+    return np.where(trades['success'], tp_percentage, -sl_percentage).astype(np.float64)
+
+
+def summary(trades, tp_percentage, sl_percentage):
+    success = int(trades['success'].sum())
+    return {
+        "total": len(trades),
+        "success": success,
+        "point": float(pnl_percentages(trades, tp_percentage, sl_percentage).sum()),
+    }
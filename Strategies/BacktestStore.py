@@ -0,0 +1,116 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+
+from Database.models import BacktestResult, Candle
+from Strategies import Backtest
+
+CODE_VERSION = hashlib.sha256(Path(Backtest.__file__).read_bytes()).hexdigest()[:16]
+
+logger = logging.getLogger(__name__)
+
+
+def params_hash(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+FINGERPRINT_FIELDS = ('open_time', 'open', 'high', 'low', 'close')
+
+
+def data_fingerprint(symbol, interval, start_time, end_time, lower_intervals=()):
+    """Hash of the candle values in [start_time, end_time], and the last open_time and count in it.
+
+    The candles of `lower_intervals` inside those candles are hashed too, since intra-candle resolution reads
+    them. Values are streamed in chunks, so any edit to a stored candle changes the hash.
+    """
+    digest = hashlib.sha256()
+    last_open_time, count = None, 0
+    for series_interval in (interval,) + tuple(lower_intervals):
+        digest.update(str(series_interval).encode())
+        series_end = end_time if series_interval == interval else end_time + interval - 1
+        for chunk in Candle.objects.iter_arrays(symbol, series_interval, start_time, series_end,
+                                                fields=FINGERPRINT_FIELDS):
+            digest.update(chunk.tobytes())
+            if series_interval == interval:
+                count += len(chunk)
+                last_open_time = int(chunk['open_time'][-1])
+    return digest.hexdigest()[:32], last_open_time, count
+
+
+def trade_array(result):
+    return np.frombuffer(bytes(result.trades), dtype=Backtest.TRADE_DTYPE).copy()
+
+
+def _resume(result, symbol, interval, end_time, tp_percentage, sl_percentage, streak_length, resolver, live_cursor):
+    """Recompute only the candles after the last resolved cached trade and append them to its trade list."""
+    cached = trade_array(result)
+    resolved = cached[cached['resolved']]
+    if not len(resolved):
+        return None
+    after = int(resolved['exit_time'][-1])
+    lookback = Candle.objects.series([symbol], interval, result.start_time, after).order_by('-open_time')
+    candles = np.concatenate([
+        Candle.objects.to_array(lookback[:streak_length - 1], Backtest.CANDLE_FIELDS)[::-1],
+        Backtest.load_candles(symbol, interval, after + 1, end_time),
+    ])
+    tail = Backtest.backtest(candles, tp_percentage, sl_percentage, streak_length, after=after, resolver=resolver,
+                             live_cursor=live_cursor)
+    return np.concatenate([resolved, tail])
+
+
+def cached_backtest(symbol, interval, start_time, end_time, tp_percentage, sl_percentage, streak_length=3,
+                    intra_candle=False, live_cursor=False, code_version=None):
+    """Backtest.backtest over stored candles, memoized per strategy code version, parameters and data.
+
+    When the cached run covers an unchanged prefix of the range, only the tail after its last resolved trade
+    is recomputed; any other change to the data falls back to a full run. With `intra_candle`, candles touching
+    both TP and SL are settled on the stored lower intervals, whose data is then part of the fingerprint.
+    `live_cursor` applies production's rule that a streak starts after the last exit (see Backtest.backtest).
+    """
+    params = {'tp_percentage': tp_percentage, 'sl_percentage': sl_percentage, 'streak_length': streak_length,
+              'intra_candle': intra_candle, 'live_cursor': live_cursor}
+    resolver = Backtest.IntraCandleResolver(symbol, interval) if intra_candle else None
+    lower_intervals = tuple(resolver.lower_intervals) if resolver is not None else ()
+    key = {
+        'symbol_id': symbol,
+        'interval': interval,
+        'start_time': start_time,
+        'code_version': code_version or CODE_VERSION,
+        'params_hash': params_hash(params),
+    }
+    fingerprint, last_open_time, candle_count = data_fingerprint(symbol, interval, start_time, end_time,
+                                                                 lower_intervals)
+    result = BacktestResult.objects.filter(**key).first()
+    if result is not None and result.data_fingerprint == fingerprint:
+        logger.debug("Backtest cache hit", extra={"symbol": symbol, "params": params})
+        return trade_array(result)
+
+    trades = None
+    if (result is not None and result.last_open_time is not None and last_open_time is not None
+            and result.last_open_time <= last_open_time
+            and data_fingerprint(symbol, interval, start_time, result.last_open_time,
+                                 lower_intervals)[0] == result.data_fingerprint):
+        trades = _resume(result, symbol, interval, end_time, tp_percentage, sl_percentage, streak_length, resolver,
+                         live_cursor)
+    mode = "tail" if trades is not None else "full"
+    if trades is None:
+        trades = Backtest.backtest(Backtest.load_candles(symbol, interval, start_time, end_time),
+                                   tp_percentage, sl_percentage, streak_length, resolver=resolver,
+                                   live_cursor=live_cursor)
+    logger.info("Backtest recomputed", extra={"symbol": symbol, "params": params, "mode": mode})
+
+    # A shorter range than the one cached is answered but never replaces it.
+    if result is None or result.last_open_time is None or (last_open_time or 0) >= result.last_open_time:
+        BacktestResult.objects.update_or_create(**key, defaults={
+            'end_time': end_time,
+            'params': params,
+            'data_fingerprint': fingerprint,
+            'last_open_time': last_open_time,
+            'candle_count': candle_count,
+            'trades': trades.tobytes(),
+            'summary': Backtest.summary(trades, tp_percentage, sl_percentage),
+        })
+    return trades
@@ -1,8 +1,10 @@
 from abc import ABC, abstractmethod
 
+import numpy as np
 import pandas as pd
 import talib
 
+from Database.cache import cached
 from Database.models import Candle
 
 
@@ -25,14 +27,17 @@ class RSI(Oscillator):
         self.limit = limit
 
     def calculate(self):
-        candles = Candle.objects.filter(symbol=self.symbol, interval=self.interval)[:self.limit]
-        if not candles.exists():
+        return cached("rsi", self.symbol, self.interval, {"period": self.period, "limit": self.limit}, self._calculate)
+
+    def _calculate(self):
+        candles = Candle.objects.load_arrays(self.symbol, self.interval, fields=('open_time', 'close'),
+                                             limit=self.limit)
+        if not len(candles):
             raise ValueError(f"هیچ کندلی برای نماد {self.symbol} و تایم‌فریم {self.interval} پیدا نشد.")
 
-        data = pd.DataFrame.from_records(candles.values('open_time', 'close'))
-        data = data.sort_values('open_time')
+        data = pd.DataFrame({'open_time': candles['open_time']})
 
-        rsi = talib.RSI(data['close'].values, timeperiod=self.period)
+        rsi = talib.RSI(np.ascontiguousarray(candles['close']), timeperiod=self.period)
 
         data['rsi'] = rsi
         return data[['open_time', 'rsi']]
\ No newline at end of file
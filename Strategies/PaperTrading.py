@@ -0,0 +1,137 @@
+import logging
+from collections import defaultdict
+
+import numpy as np
+import requests
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from Database.models import Candle, PaperPosition, PaperVariant, PositionDirection
+from ExchangeAPI.MarketData import get_router
+
+SERIES_FIELDS = ('open_time', 'high', 'low', 'close', 'direction')
+
+logger = logging.getLogger(__name__)
+
+
+def run_lengths(direction):
+    """Length of the same-direction run ending at each candle."""
+    index = np.arange(len(direction))
+    starts = np.r_[True, direction[1:] != direction[:-1]] if len(direction) else np.zeros(0, dtype=bool)
+    return index - np.maximum.accumulate(np.where(starts, index, 0)) + 1
+
+
+class PaperTrader:
+    """Runs every enabled PaperVariant against the stored candles and one mark price per symbol.
+
+    Candles and streak run lengths are loaded and computed once per (symbol, interval); each variant
+    then only inspects the tail of those arrays, so adding variants costs almost nothing per tick.
+    Orders fill locally at the mark price with the same TP/SL rules as the production tasks.
+    """
+
+    def __init__(self, price_source=None):
+        self.price_source = price_source or (lambda symbol: float(get_router().fetch_mark_price(symbol)))
+
+    def tick(self, now_ms):
+        # Plain rows rather than model instances keep the fixed cost of each variant low.
+        variants = list(PaperVariant.objects.filter(enabled=True).values_list(
+            'id', 'symbol_id', 'interval', 'streak_length', 'tp_percentage', 'sl_percentage', 'quantity_usdt',
+            'timestamp_cursor', named=True))
+        open_positions = {position.variant_id: position for position in PaperPosition.objects.filter(
+            variant__enabled=True, exit_time__isnull=True)}
+        series = defaultdict(list)
+        for variant in variants:
+            series[(variant.symbol_id, variant.interval)].append(variant)
+
+        prices = {}
+        opened, closed, moved = [], [], []
+        for (symbol, interval), members in series.items():
+            if symbol not in prices:
+                try:
+                    prices[symbol] = self.price_source(symbol)
+                except (requests.RequestException, ValueError) as e:
+                    logger.warning("Paper trading skipped a symbol", extra={"symbol": symbol, "error": str(e)})
+                    prices[symbol] = None
+            if prices[symbol] is None:
+                continue
+
+            start_time = now_ms - (max(variant.streak_length for variant in members) + 1) * interval
+            entries = [open_positions[variant.id].entry_time for variant in members if variant.id in open_positions]
+            if entries:
+                start_time = min(start_time, min(entries) - interval)
+            candles = Candle.objects.load_arrays(symbol, interval, start_time, now_ms - interval, fields=SERIES_FIELDS)
+            runs = run_lengths(candles['direction'])
+
+            for variant in members:
+                position = open_positions.get(variant.id)
+                if position is not None:
+                    if self._resolve(position, candles, interval, prices[symbol], now_ms):
+                        closed.append(position)
+                        moved.append(variant.id)
+                    continue
+                position = self._signal(variant, candles, runs, prices[symbol], now_ms)
+                if position is not None:
+                    opened.append(position)
+
+        with transaction.atomic():
+            PaperPosition.objects.bulk_create(opened)
+            for position in closed:
+                PaperPosition.objects.filter(pk=position.pk).update(
+                    exit_time=position.exit_time,
+                    exit_price=position.exit_price,
+                    outcome=position.outcome,
+                    pnl_percentage=position.pnl_percentage,
+                )
+            # As in production, a closed position moves the cursor so its candles cannot signal again.
+            PaperVariant.objects.filter(pk__in=moved).update(timestamp_cursor=now_ms)
+        return {"variants": len(variants), "opened": len(opened), "closed": len(closed)}
+
+    def _signal(self, variant, candles, runs, price, now_ms):
+        # Same rule as run_check_candles_and_open: the last `streak_length` closed candles after the cursor agree.
+        length = variant.streak_length
+        if len(candles) < length or runs[-1] < length or candles['open_time'][-length] <= variant.timestamp_cursor:
+            return None
+        sign = 1 if candles['direction'][-1] > 0 else -1
+        return PaperPosition(
+            variant_id=variant.id,
+            direction=PositionDirection.long.value if sign > 0 else PositionDirection.short.value,
+            signal_time=int(candles['open_time'][-1]),
+            entry_time=now_ms,
+            entry_price=price,
+            quantity=variant.quantity_usdt / price,
+            tp_price=price * (1 + sign * variant.tp_percentage / 100),
+            sl_price=price * (1 - sign * variant.sl_percentage / 100),
+        )
+
+    def _resolve(self, position, candles, interval, price, now_ms):
+        """Close the position at its first touched trigger; the stop wins when one candle touches both."""
+        long = position.direction == PositionDirection.long.value
+        window = candles[np.searchsorted(candles['open_time'], position.entry_time - interval, side='right'):]
+        highs = np.append(window['high'], price)
+        lows = np.append(window['low'], price)
+        if long:
+            sl_hit, tp_hit = lows <= position.sl_price, highs >= position.tp_price
+        else:
+            sl_hit, tp_hit = highs >= position.sl_price, lows <= position.tp_price
+        hit = sl_hit | tp_hit
+        if not hit.any():
+            return False
+        index = int(hit.argmax())
+        position.exit_time = int(window['open_time'][index]) if index < len(window) else now_ms
+        position.outcome = "sl" if sl_hit[index] else "tp"
+        position.exit_price = position.sl_price if sl_hit[index] else position.tp_price
+        sign = 1 if long else -1
+        position.pnl_percentage = sign * (position.exit_price - position.entry_price) / position.entry_price * 100
+        return True
+
+
+def variant_summary(variants=None):
+    """Closed trade count, wins, open positions and summed PnL percentage per variant."""
+    queryset = PaperVariant.objects.all() if variants is None else variants
+    return list(queryset.annotate(
+        trades=Count('positions', filter=Q(positions__exit_time__isnull=False)),
+        wins=Count('positions', filter=Q(positions__outcome="tp")),
+        open_positions=Count('positions', filter=Q(positions__exit_time__isnull=True)),
+        pnl_percentage=Sum('positions__pnl_percentage'),
+    ).values('name', 'symbol_id', 'interval', 'streak_length', 'tp_percentage', 'sl_percentage',
+             'trades', 'wins', 'open_positions', 'pnl_percentage'))
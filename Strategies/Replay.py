@@ -0,0 +1,155 @@
+from decimal import Decimal
+
+from Database import tasks
+from Database.exceptions import WrongActionBasedOnState
+from Database.models import Candle, PositionDirection, PlanType, SideFutures, State
+
+
+class SimulatedClock:
+    def __init__(self, now_ms=0):
+        self.now = int(now_ms)
+
+    def now_ms(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += int(seconds * 1000)
+
+
+class SimulatedPositionManager:
+    """Stands in for PositionManager in the tasks, filling orders locally instead of on the exchange."""
+
+    def __init__(self, clock, timestamp_cursor=100):
+        self.clock = clock
+        self.timestamp_cursor = timestamp_cursor
+        self.is_position_active = False
+        self.remote_id = None
+        self.sl_order_price = None
+        self.state = State.Inactive.value
+        self.order_sequence = 0
+        self.open_attempt = None
+        self.mark_price = None
+        self.position = None
+        self.plans = {}
+        self.trades = []
+        self.traces = []
+        self._next_id = 0
+
+    def save(self, *args, **kwargs):
+        pass
+
+    def transition(self, from_state, to_state, **fields):
+        if self.state != from_state.value:
+            raise WrongActionBasedOnState
+        if to_state == State.Pending:
+            self.order_sequence += 1
+        self.state = to_state.value
+        self.is_position_active = to_state != State.Inactive
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def client_oid(self, leg):
+        return f"replay-{self.order_sequence}-{leg}"
+
+    def save_open_attempt(self):
+        pass
+
+    def record_trace(self, trace):
+        self.traces.append(trace.to_dict())
+
+    def _new_id(self):
+        self._next_id += 1
+        return str(self._next_id)
+
+    def get_price(self, coin):
+        return Decimal(str(self.mark_price))
+
+    def futures_trade(self, coin, quantity, side, client_oid=None):
+        self.position = {
+            "direction": SideFutures.get_position_direction(side),
+            "entry_time": self.clock.now_ms(),
+            "entry_price": self.mark_price,
+            "quantity": quantity,
+        }
+        return self._new_id()
+
+    def place_sltp(self, coin, plan_type, trigger_price, direction, quantity, client_oid=None):
+        remote_id = self._new_id()
+        self.plans[remote_id] = {"plan_type": plan_type, "trigger_price": float(trigger_price)}
+        return remote_id
+
+    def modify_sltp(self, coin, plan_type, remote_id, trigger_price):
+        # The exchange answers 43020 once the plan's position is gone.
+        if remote_id not in self.plans:
+            return "Changed"
+        self.plans[remote_id]["trigger_price"] = float(trigger_price)
+        return True
+
+    def cancel_sltp(self, sltporder):
+        self.plans.pop(sltporder.remote_id, None)
+        return True
+
+    def advance(self, open_time, high, low, close):
+        """Resolve TP/SL triggers against one candle, then move the mark price to its close."""
+        if self.position is not None and self.plans:
+            tp = next(plan["trigger_price"] for plan in self.plans.values() if plan["plan_type"] == PlanType.tp.value)
+            sl = next(plan["trigger_price"] for plan in self.plans.values() if plan["plan_type"] == PlanType.sl.value)
+            if self.position["direction"] == PositionDirection.long.value:
+                sl_hit, tp_hit = low <= sl, high >= tp
+            else:
+                sl_hit, tp_hit = high >= sl, low <= tp
+            # When one candle touches both levels the stop is assumed to fill first.
+            if sl_hit:
+                self._close(open_time, sl, "sl")
+            elif tp_hit:
+                self._close(open_time, tp, "tp")
+        self.mark_price = close
+
+    def _close(self, open_time, exit_price, outcome):
+        entry_price = self.position["entry_price"]
+        sign = 1 if self.position["direction"] == PositionDirection.long.value else -1
+        self.trades.append({
+            **self.position,
+            "exit_time": open_time,
+            "exit_price": exit_price,
+            "outcome": outcome,
+            "pnl_percentage": sign * (exit_price - entry_price) / entry_price * 100,
+        })
+        self.position = None
+        self.plans = {}
+
+
+class ReplayEngine:
+    """Feed stored candles through the production task code with a simulated clock and exchange."""
+
+    def __init__(self, start_time, end_time, tick_offset_ms=1000):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.tick_offset_ms = tick_offset_ms
+        self.clock = SimulatedClock(start_time)
+        self.position_manager = SimulatedPositionManager(clock=self.clock, timestamp_cursor=start_time)
+
+    def run(self):
+        interval_ms = tasks.INTERVAL.to_db_format()
+        candles = Candle.objects.load_arrays(tasks.SYMBOL, interval_ms, self.start_time, self.end_time - 1,
+                                             fields=('open_time', 'high', 'low', 'close'))
+
+        for open_time, high, low, close in candles.tolist():
+            self.position_manager.advance(open_time, high, low, close)
+            self.clock.now = open_time + interval_ms + self.tick_offset_ms
+            tasks.run_check_position(position_manager=self.position_manager, clock=self.clock)
+            self.clock.sleep(1)
+            tasks.run_check_candles_and_open(position_manager=self.position_manager, clock=self.clock)
+
+        return self.position_manager.trades
+
+    def summary(self):
+        trades = self.position_manager.trades
+        wins = sum(1 for trade in trades if trade["outcome"] == "tp")
+        losses = len(trades) - wins
+        return {
+            "total": len(trades),
+            "success": wins,
+            "point": wins * tasks.tp_percentage - losses * tasks.sl_percentage,
+            "pnl_percentage": sum(trade["pnl_percentage"] for trade in trades),
+        }
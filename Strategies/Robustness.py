@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Strategies import Backtest
+
+METRICS = ('total', 'expectancy', 'win_rate', 'max_drawdown')
+
+_candles = None
+
+
+def _seed_sequence(seed):
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+
+def trade_pnl(trades, tp_percentage, sl_percentage):
+    """Per-trade PnL in percent for the resolved trades of a backtest."""
+    return Backtest.pnl_percentages(trades[trades['resolved']], tp_percentage, sl_percentage)
+
+
+def metrics(pnl):
+    """Metrics of every row of a (samples, trades) PnL matrix, with equity as the running sum of percentages."""
+    pnl = np.atleast_2d(pnl)
+    equity = np.cumsum(pnl, axis=1)
+    peaks = np.maximum.accumulate(np.maximum(equity, 0), axis=1)
+    return {
+        'total': equity[:, -1] if pnl.shape[1] else np.zeros(len(pnl)),
+        'expectancy': pnl.mean(axis=1) if pnl.shape[1] else np.zeros(len(pnl)),
+        'win_rate': (pnl > 0).mean(axis=1) if pnl.shape[1] else np.zeros(len(pnl)),
+        'max_drawdown': (peaks - equity).max(axis=1, initial=0),
+    }
+
+
+def _resample(kind, pnl, count, seed, batch_size):
+    rng = np.random.default_rng(seed)
+    results = {name: [] for name in METRICS}
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        if kind == 'bootstrap':
+            batch = pnl[rng.integers(0, len(pnl), size=(size, len(pnl)))]
+        else:
+            batch = rng.permuted(np.broadcast_to(pnl, (size, len(pnl))), axis=1)
+        for name, values in metrics(batch).items():
+            results[name].append(values)
+    return {name: np.concatenate(values) for name, values in results.items()}
+
+
+def resample(kind, pnl, count=10000, seed=None, workers=None, batch_size=2000):
+    """Bootstrap (with replacement) or permutation (trade order) resamples, split across a process pool."""
+    if kind not in ('bootstrap', 'permutation'):
+        raise ValueError(f"Unknown resampling kind {kind}")
+    pnl = np.asarray(pnl, dtype=np.float64)
+    workers = workers or os.cpu_count() or 1
+    counts = [count // workers + (1 if i < count % workers else 0) for i in range(workers)]
+    seeds = _seed_sequence(seed).spawn(workers)
+    if workers == 1:
+        parts = [_resample(kind, pnl, counts[0], seeds[0], batch_size)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as executor:
+            parts = list(executor.map(_resample, [kind] * workers, [pnl] * workers, counts, seeds,
+                                      [batch_size] * workers))
+    return {name: np.concatenate([part[name] for part in parts]) for name in METRICS}
+
+
+def _set_candles(candles):
+    global _candles
+    _candles = candles
+
+
+def _run_parameters(tp_percentage, sl_percentage, streak_length):
+    trades = Backtest.backtest(_candles, tp_percentage, sl_percentage, streak_length)
+    pnl = trade_pnl(trades, tp_percentage, sl_percentage)
+    return {name: float(values[0]) for name, values in metrics(pnl.reshape(1, -1)).items()}
+
+
+def perturb(candles, tp_percentage, sl_percentage, streak_length=3, count=200, jitter=0.25, seed=None,
+            workers=None):
+    """Re-run the backtest with TP/SL drawn uniformly within +-jitter of the given values."""
+    rng = np.random.default_rng(seed)
+    tps = tp_percentage * rng.uniform(1 - jitter, 1 + jitter, count)
+    sls = sl_percentage * rng.uniform(1 - jitter, 1 + jitter, count)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                             initializer=_set_candles, initargs=(candles,)) as executor:
+        runs = list(executor.map(_run_parameters, tps, sls, [streak_length] * count, chunksize=max(1, count // 64)))
+    results = {name: np.array([run[name] for run in runs]) for name in METRICS}
+    results['tp_percentage'] = tps
+    results['sl_percentage'] = sls
+    return results
+
+
+def confidence_intervals(samples, confidence=0.95):
+    tail = (1 - confidence) / 2 * 100
+    return {
+        name: {
+            'mean': float(values.mean()),
+            'low': float(np.percentile(values, tail)),
+            'median': float(np.median(values)),
+            'high': float(np.percentile(values, 100 - tail)),
+        }
+        for name, values in samples.items() if name in METRICS and len(values)
+    }
+
+
+def analyze(trades, tp_percentage, sl_percentage, candles=None, streak_length=3, resamples=10000,
+            perturbations=200, confidence=0.95, seed=0, workers=None):
+    """Robustness report of one backtest: the observed metrics and confidence intervals under resampling."""
+    pnl = trade_pnl(trades, tp_percentage, sl_percentage)
+    report = {
+        'trades': len(pnl),
+        'observed': {name: float(values[0]) for name, values in metrics(pnl.reshape(1, -1)).items()},
+    }
+    if not len(pnl):
+        return report
+    seeds = _seed_sequence(seed).spawn(3)
+    report['bootstrap'] = confidence_intervals(resample('bootstrap', pnl, resamples, seeds[0], workers), confidence)
+    report['permutation'] = confidence_intervals(resample('permutation', pnl, resamples, seeds[1], workers),
+                                                 confidence)
+    if candles is not None and perturbations:
+        report['perturbation'] = confidence_intervals(
+            perturb(candles, tp_percentage, sl_percentage, streak_length, perturbations, seed=seeds[2],
+                    workers=workers), confidence)
+    return report
@@ -0,0 +1,227 @@
+from datetime import datetime, timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from Database.models import Candle, Symbol, UniverseRanking
+
+SERIES_FIELDS = ('open_time', 'close', 'usdt_volume')
+
+
+def aligned_matrix(symbols, interval, start_time, end_time):
+    """Closes and USDT volumes of several series on one open_time grid, as (time, symbol) matrices.
+
+    Candles missing from a series are NaN, so gaps never shift one symbol against another; a requested symbol
+    with no candles at all keeps an all-NaN column.
+    """
+    first = start_time + (-start_time) % interval
+    times = np.arange(first, end_time + 1, interval, dtype=np.int64)
+    series = Candle.objects.load_many(symbols, interval, first, end_time, fields=SERIES_FIELDS)
+    symbols = sorted(set(symbols))
+    closes = np.full((len(times), len(symbols)), np.nan)
+    volumes = np.full((len(times), len(symbols)), np.nan)
+    for column, symbol in enumerate(symbols):
+        rows = series.get(symbol)
+        if rows is None:
+            continue
+        offsets = rows['open_time'] - first
+        rows = rows[offsets % interval == 0]
+        index = (rows['open_time'] - first) // interval
+        closes[index, column] = rows['close']
+        volumes[index, column] = rows['usdt_volume']
+    return times, symbols, closes, volumes
+
+
+def log_returns(closes):
+    """Per-candle log returns, aligned to the later candle; NaN wherever either close is missing."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.diff(np.log(closes), axis=0)
+
+
+class RollingStats:
+    """Window sums of a (time, symbol) returns matrix, kept pairwise-complete so gaps in one symbol
+    never drop rows from the others.
+
+    Advancing by k rows adds their outer products and subtracts those of the rows leaving the window,
+    O(k * n^2) instead of recomputing the whole window.
+    """
+
+    def __init__(self, symbols, window):
+        count = len(symbols)
+        self.symbols = list(symbols)
+        self.window = window
+        self.returns = np.empty((0, count))
+        self.volumes = np.empty((0, count))
+        self._reset()
+
+    def _reset(self):
+        count = len(self.symbols)
+        self.pair_count = np.zeros((count, count))
+        self.cross = np.zeros((count, count))
+        self.sums = np.zeros((count, count))
+        self.squares = np.zeros((count, count))
+        self.volume_sum = np.zeros(count)
+        self.volume_count = np.zeros(count)
+
+    def _accumulate(self, returns, volumes, sign):
+        present = ~np.isnan(returns)
+        values = np.where(present, returns, 0.0)
+        mask = present.astype(np.float64)
+        # sums[i, j] is the sum of symbol i's returns over the rows where j is present too.
+        self.pair_count += sign * (mask.T @ mask)
+        self.cross += sign * (values.T @ values)
+        self.sums += sign * (values.T @ mask)
+        self.squares += sign * ((values * values).T @ mask)
+        traded = ~np.isnan(volumes)
+        self.volume_sum += sign * np.where(traded, volumes, 0.0).sum(axis=0)
+        self.volume_count += sign * traded.sum(axis=0)
+
+    def update(self, returns, volumes):
+        returns = np.asarray(returns, dtype=np.float64).reshape(-1, len(self.symbols))
+        volumes = np.asarray(volumes, dtype=np.float64).reshape(-1, len(self.symbols))
+        if len(returns) >= self.window:
+            self.returns = returns[-self.window:].copy()
+            self.volumes = volumes[-self.window:].copy()
+            self._reset()
+            self._accumulate(self.returns, self.volumes, 1)
+            return
+        self._accumulate(returns, volumes, 1)
+        self.returns = np.concatenate([self.returns, returns])
+        self.volumes = np.concatenate([self.volumes, volumes])
+        overflow = len(self.returns) - self.window
+        if overflow > 0:
+            self._accumulate(self.returns[:overflow], self.volumes[:overflow], -1)
+            self.returns = self.returns[overflow:]
+            self.volumes = self.volumes[overflow:]
+
+    def coverage(self):
+        return np.diag(self.pair_count) / self.window
+
+    def volatility(self):
+        """Standard deviation of each symbol's per-candle log returns over the window."""
+        count = np.diag(self.pair_count)
+        sums = np.diag(self.sums)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = (np.diag(self.squares) - sums * sums / count) / (count - 1)
+        return np.sqrt(np.maximum(variance, 0.0))
+
+    def liquidity(self):
+        """Mean USDT volume per candle over the window."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.volume_sum / self.volume_count
+
+    def correlation(self, min_periods=2):
+        count = self.pair_count
+        covariance = count * self.cross - self.sums * self.sums.T
+        variance = count * self.squares - self.sums * self.sums
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = covariance / np.sqrt(variance * variance.T)
+        correlation[count < min_periods] = np.nan
+        return np.clip(correlation, -1.0, 1.0)
+
+
+def _percentile_ranks(values, eligible):
+    ranks = np.full(len(values), np.nan)
+    count = int(eligible.sum())
+    if count:
+        ranks[eligible] = values[eligible].argsort().argsort() / max(count - 1, 1)
+    return ranks
+
+
+def rank(stats, min_coverage=None, weights=None):
+    """Score the symbols of a window by liquidity, volatility and how little they move with the rest.
+
+    Symbols with too little data in the window are listed with no rank or score.
+    """
+    min_coverage = settings.UNIVERSE_MIN_COVERAGE if min_coverage is None else min_coverage
+    weights = weights or settings.UNIVERSE_SCORE_WEIGHTS
+    volatility = stats.volatility()
+    liquidity = stats.liquidity()
+    coverage = stats.coverage()
+    eligible = (coverage >= min_coverage) & np.isfinite(volatility) & np.isfinite(liquidity)
+
+    correlation = np.abs(stats.correlation())
+    np.fill_diagonal(correlation, np.nan)
+    correlation[:, ~eligible] = np.nan
+    known = np.isfinite(correlation)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_correlation = np.where(known, correlation, 0.0).sum(axis=1) / known.sum(axis=1)
+
+    # A symbol with no comparable correlation proves no diversification, so it ranks as the most correlated.
+    diversification = -np.where(np.isfinite(mean_correlation), mean_correlation, np.inf)
+    score = (weights['liquidity'] * _percentile_ranks(liquidity, eligible)
+             + weights['volatility'] * _percentile_ranks(volatility, eligible)
+             + weights['diversification'] * _percentile_ranks(diversification, eligible))
+    order = sorted(range(len(stats.symbols)),
+                   key=lambda column: (not eligible[column], -np.nan_to_num(score[column])))
+    ranking = []
+    for position, column in enumerate(order):
+        ranking.append({
+            'symbol': stats.symbols[column],
+            'rank': position + 1 if eligible[column] else None,
+            'score': float(score[column]) if eligible[column] else None,
+            'volatility': _optional(volatility[column]),
+            'usdt_volume': _optional(liquidity[column]),
+            'mean_correlation': _optional(mean_correlation[column]),
+            'coverage': float(coverage[column]),
+        })
+    return ranking
+
+
+def _optional(value):
+    return float(value) if np.isfinite(value) else None
+
+
+def rank_days(interval, end_times, window, symbols=None, min_coverage=None, weights=None):
+    """Yield (end_time, ranking) for each ascending end_time, ranking the `window` candles closed before it.
+
+    One aligned matrix is loaded for the whole span and a single RollingStats is advanced across it.
+    """
+    end_times = sorted(end_times)
+    if symbols is None:
+        symbols = list(Symbol.objects.values_list('symbol', flat=True))
+    times, symbols, closes, volumes = aligned_matrix(symbols, interval, end_times[0] - (window + 1) * interval,
+                                                     end_times[-1] - interval)
+    returns = log_returns(closes)
+    volumes = volumes[1:]
+    stats = RollingStats(symbols, window)
+    position = 0
+    for end_time in end_times:
+        upto = int(np.searchsorted(times[1:], end_time - interval, side='right'))
+        stats.update(returns[position:upto], volumes[position:upto])
+        position = upto
+        yield end_time, rank(stats, min_coverage, weights)
+
+
+def save_ranking(day, interval, ranking):
+    with transaction.atomic():
+        UniverseRanking.objects.filter(day=day, interval=interval).delete()
+        UniverseRanking.objects.bulk_create([
+            UniverseRanking(day=day, interval=interval, symbol_id=row['symbol'],
+                            **{name: value for name, value in row.items() if name != 'symbol'})
+            for row in ranking
+        ])
+
+
+def update_rankings(interval, end_time, days=1, window_days=None):
+    """Rank and store the universe at the last `days` UTC day boundaries up to end_time."""
+    window_days = window_days or settings.UNIVERSE_WINDOW_DAYS
+    day_ms = 24 * 60 * 60 * 1000
+    last = end_time - end_time % day_ms
+    end_times = [last - offset * day_ms for offset in range(days)]
+    saved = 0
+    for boundary, ranking in rank_days(interval, end_times, window_days * day_ms // interval):
+        # The ranking at a boundary describes the day that just ended.
+        day = datetime.fromtimestamp((boundary - day_ms) / 1000, tz=timezone.utc).date()
+        save_ranking(day, interval, ranking)
+        saved += len(ranking)
+    return saved
+
+
+def tradable_universe(interval, day=None, limit=10):
+    """The top ranked symbols of the latest (or a given) day."""
+    rankings = UniverseRanking.objects.filter(interval=interval, rank__isnull=False)
+    if day is None:
+        day = rankings.order_by('-day').values_list('day', flat=True).first()
+    return list(rankings.filter(day=day).order_by('rank').values_list('symbol_id', flat=True)[:limit])